@@ -1,22 +1,83 @@
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton,
-    QTextEdit, QGroupBox, QLabel, QApplication, QMessageBox, QComboBox,
-    QTabWidget
+    QGroupBox, QLabel, QApplication, QMessageBox, QComboBox,
+    QTabWidget, QCheckBox, QFileDialog, QProgressBar
 )
-from PyQt6.QtCore import QTimer
-from smartcard.System import readers
-from smartcard.Exceptions import NoCardException
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from pcsc import PCSCBackend, CardMonitor
+from registry import ReaderRegistry
+from worker import DeviceWorker
+from connections import ConnectionManager
+from arbiter import ReaderArbiter
+from ntag import TagIO, ProfileCache, fault_of, READER_FAULT, TAG_FAULT, UIDCache, read_ndef_message, write_job, is_locked, any_lock_bits
+from simulator import backend_from_env
+from jobs import JobQueue
+from journal import Journal, batch_id
+from tagcache import LockedTagCache
+from station import WriteStation, IDLE, WRITING, DONE, FAILED, FINISHED, QUARANTINED
+from health import HealthMonitor
+from procstation import ProcessStation, STALLED, pcsc_backend, simulated_backend
+from logview import LogView, DEBUG, INFO, WARNING, ERROR
+from ndef import normalize_url, InvalidURL, decode_message, decode_uri, is_uri_record
+from functools import partial
 import sys
+import time
 import webbrowser
 
+
+class CardEvents(QObject):
+    # Carries card monitor callbacks from its thread onto the GUI thread
+    changed = pyqtSignal(str, bool)
+    error = pyqtSignal(str)
+    readers = pyqtSignal(object)
+
+
+class StationEvents(QObject):
+    # Per-reader status from the write station's worker threads
+    status = pyqtSignal(str, str, object)
+
+
+STATION_COLORS = {IDLE: "red", WRITING: "yellow", DONE: "orange", FAILED: "purple", FINISHED: "gray", STALLED: "black",
+                  QUARANTINED: "darkred"}
+
+
+class DeviceEvents(QObject):
+    # Delivers device worker completions and log lines to the GUI thread
+    done = pyqtSignal(object, object)
+    log = pyqtSignal(object, int, str, object)
+
+
 class NFCApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, backend=None):
         super().__init__()
+        self.backend = backend or PCSCBackend()
+        self.device_worker = DeviceWorker()
+        self.connections = ConnectionManager(self.backend)
+        self.arbiter = ReaderArbiter(self.backend, self.connections)  # Shared with the write station
+        self.fast_read_supported = {}  # Reader name -> whether FAST_READ passes through
+        self.tag_profiles = ProfileCache()
+        self.read_cache = UIDCache()  # UID -> (profile, url) of tags already parsed
+        self.log_level = INFO  # Checked before an event is queued, from any thread
+        self.jobs = None
+        self.job_batch = None
+        self.station = None
+        self.station_lights = {}
+        self.health = HealthMonitor()  # Per-reader scores from every write, station or not
+        # Commit errors come from the journal's writer thread; write_log is thread-safe
+        # Simulated runs must not touch the real journal or mark real UIDs as locked
+        storage = None if isinstance(self.backend, PCSCBackend) else ":memory:"
+        self.journal = Journal(storage, on_error=lambda message: self.write_log(message, ERROR))
+        self.locked_tags = LockedTagCache(storage)  # Survives restarts; locked tags never change
+        self.locked_tags.import_journal(self.journal)
+        self.device_events = DeviceEvents()
+        self.device_events.done.connect(lambda callback, future: callback(future))
+        self.device_events.log.connect(self.append_log)
         self.setWindowTitle("NFC URL Reader/Writer (ACR-1252)")
         self.setMinimumWidth(600)
         self.write_connection = None
         self.read_connection = None
         self.card_detected = False
+        self.auto_armed = True  # Auto mode writes once per insertion, re-armed on removal
         self.remaining_writes = 1
 
         # Create main widget and layout
@@ -65,17 +126,63 @@ class NFCApp(QMainWindow):
 
         # Write tab - Add write counter combo box
         write_counter_layout = QHBoxLayout()
-        write_counter_layout.addWidget(QLabel("Number of writes:"))
+        self.write_counter_label = QLabel("Number of writes:")
+        write_counter_layout.addWidget(self.write_counter_label)
         self.write_counter_combo = QComboBox()
         self.write_counter_combo.addItems([str(i) for i in range(1, 11)])
         write_counter_layout.addWidget(self.write_counter_combo)
         url_layout.addLayout(write_counter_layout)
 
+        # Write tab - Read back and check the tag before locking it
+        self.verify_checkbox = QCheckBox("Verify before locking")
+        self.verify_checkbox.setChecked(True)
+        url_layout.addWidget(self.verify_checkbox)
+
+        # Write tab - Hands-free mode: write as soon as a tag is placed and
+        # report through the light, status bar and a beep instead of dialogs
+        self.auto_checkbox = QCheckBox("Auto-write on card insertion")
+        url_layout.addWidget(self.auto_checkbox)
+
+        # Write tab - Page and APDU dumps in both logs; off in production
+        self.debug_checkbox = QCheckBox("Debug log (APDU dumps)")
+        url_layout.addWidget(self.debug_checkbox)
+
         # Write tab - Add remaining writes label
         self.remaining_writes_label = QLabel("Remaining writes: 1")
         url_layout.addWidget(self.remaining_writes_label)
         write_layout.addWidget(url_group)
 
+        # Write tab - Batch job queue; when loaded it replaces the write counter
+        job_group = QGroupBox("Job Queue")
+        job_layout = QVBoxLayout(job_group)
+        job_button_layout = QHBoxLayout()
+        self.load_jobs_button = QPushButton("Load CSV/JSONL...")
+        self.skip_job_button = QPushButton("Skip")
+        self.retry_jobs_button = QPushButton("Retry Skipped")
+        self.clear_jobs_button = QPushButton("Clear")
+        job_button_layout.addWidget(self.load_jobs_button)
+        job_button_layout.addWidget(self.skip_job_button)
+        job_button_layout.addWidget(self.retry_jobs_button)
+        job_button_layout.addWidget(self.clear_jobs_button)
+        job_layout.addLayout(job_button_layout)
+        self.job_progress = QProgressBar()
+        job_layout.addWidget(self.job_progress)
+        self.job_status_label = QLabel("No job file loaded")
+        job_layout.addWidget(self.job_status_label)
+        write_layout.addWidget(job_group)
+
+        # Write tab - Station mode: every ACR-1252 writes from the job queue
+        station_group = QGroupBox("Write Station")
+        station_layout = QHBoxLayout(station_group)
+        self.station_button = QPushButton("Start Station")
+        station_layout.addWidget(self.station_button)
+        self.station_processes_checkbox = QCheckBox("One process per reader")
+        station_layout.addWidget(self.station_processes_checkbox)
+        self.station_lights_layout = QHBoxLayout()
+        station_layout.addLayout(self.station_lights_layout)
+        station_layout.addStretch()
+        write_layout.addWidget(station_group)
+
         # Write tab - Buttons
         write_button_layout = QHBoxLayout()
         self.write_button = QPushButton("Write URL and Lock")
@@ -94,8 +201,7 @@ class NFCApp(QMainWindow):
         write_layout.addLayout(write_status_layout)
 
         # Write tab - Status log
-        self.write_status_log = QTextEdit()
-        self.write_status_log.setReadOnly(True)
+        self.write_status_log = LogView()
         write_layout.addWidget(self.write_status_log)
 
         # Read tab - Control group
@@ -127,350 +233,645 @@ class NFCApp(QMainWindow):
         read_layout.addWidget(read_status_group)
 
         # Read tab - Status log
-        self.read_status_log = QTextEdit()
-        self.read_status_log.setReadOnly(True)
+        self.read_status_log = LogView()
         read_layout.addWidget(self.read_status_log)
 
-        # Timers for card detection
-        self.write_card_timer = QTimer()
-        self.write_card_timer.timeout.connect(self.check_for_write_card)
-        self.write_card_timer.start(1000)  # Check for card every second
-
-        self.read_card_timer = QTimer()
-        self.read_card_timer.timeout.connect(self.check_for_read_card)
-        self.read_card_timer.start(1000)  # Check for card every second
+        # Card detection is pushed from PC/SC status changes instead of polled
+        self.card_events = CardEvents()
+        self.card_events.changed.connect(self.on_card_event)
+        self.card_events.error.connect(lambda message: self.write_log(message, ERROR))
+        self.card_monitor = CardMonitor(
+            self.backend, self.card_events.changed.emit, self.card_events.error.emit
+        )
+        # Readers are enumerated once per plug or unplug, and both tabs share the list
+        self.card_events.readers.connect(self.on_readers_changed)
+        self.reader_registry = ReaderRegistry(
+            self.backend, self.card_events.readers.emit, self.card_events.error.emit
+        )
+        self.known_readers = set()
 
         # Connect buttons
         self.write_button.clicked.connect(self.write_and_lock_url)
         self.reset_button.clicked.connect(self.reset)
-        self.write_refresh_button.clicked.connect(self.refresh_writers)
-        self.read_refresh_button.clicked.connect(self.refresh_readers)
+        self.write_refresh_button.clicked.connect(self.force_refresh_readers)
+        self.read_refresh_button.clicked.connect(self.force_refresh_readers)
         self.write_counter_combo.currentTextChanged.connect(self.on_write_counter_changed)
+        self.load_jobs_button.clicked.connect(self.load_jobs)
+        self.skip_job_button.clicked.connect(self.skip_job)
+        self.retry_jobs_button.clicked.connect(self.retry_skipped_jobs)
+        self.clear_jobs_button.clicked.connect(self.clear_jobs)
+        self.station_button.clicked.connect(self.toggle_station)
+        self.station_events = StationEvents()
+        self.station_events.status.connect(self.on_station_status)
+        # Process stations publish status in shared memory; reading it is cheap
+        self.station_timer = QTimer(self)
+        self.station_timer.setInterval(200)
+        self.station_timer.timeout.connect(self.poll_station)
+        self.auto_checkbox.toggled.connect(self.toggle_auto_write)
+        self.debug_checkbox.toggled.connect(self.toggle_debug_log)
+        self.writer_combo.currentTextChanged.connect(self.update_watched_readers)
+        self.reader_combo.currentTextChanged.connect(self.update_watched_readers)
 
         # Initialize state
+        self.reader_active = False
+        self.known_readers = set(self.reader_registry.refresh(notify=False))
         self.refresh_writers()
         self.refresh_readers()
-        self.reader_active = False
+        self.reader_registry.start()
         self.read_toggle_button.clicked.connect(self.toggle_reader)
-
-    def write_log(self, message):
-        self.write_status_log.append(message)
-        self.write_status_log.verticalScrollBar().setValue(
-            self.write_status_log.verticalScrollBar().maximum()
-        )
-
-    def read_log(self, message):
-        self.read_status_log.append(message)
-        self.read_status_log.verticalScrollBar().setValue(
-            self.read_status_log.verticalScrollBar().maximum()
-        )
+        self.update_job_controls()
+        self.card_monitor.start()
+
+    # write_log/read_log are safe to call from the device worker thread
+    # data holds the values for the {} placeholders in message; they are only
+    # formatted (bytes as hex) when the line is displayed
+    def write_log(self, message, level=INFO, *data):
+        if level >= self.log_level:
+            self.device_events.log.emit(self.write_status_log, level, message, data)
+
+    def read_log(self, message, level=INFO, *data):
+        if level >= self.log_level:
+            self.device_events.log.emit(self.read_status_log, level, message, data)
+
+    def append_log(self, log, level, message, data):
+        log.log(level, message, data)
+
+    def toggle_debug_log(self, enabled):
+        self.log_level = DEBUG if enabled else INFO
+        for log in (self.write_status_log, self.read_status_log):
+            log.model().level = self.log_level
+
+    def tracer(self, log):
+        # APDU dumps, only wired into TagIO while debug logging is on
+        if self.log_level > DEBUG:
+            return None
+        return lambda apdu, response, sw1, sw2: log("> {}  < {} {}", DEBUG, bytes(apdu), bytes(response), bytes([sw1, sw2]))
+
+    def notify(self, kind, title, message):
+        # kind is "information", "warning" or "critical", as on QMessageBox
+        if not self.auto_checkbox.isChecked():
+            getattr(QMessageBox, kind)(self, title, message)
+            return
+        self.statusBar().showMessage(f"{title}: {message}", 5000)
+        QApplication.beep()
+        if kind != "information":
+            # A second beep so failures can be told apart without looking
+            QTimer.singleShot(200, QApplication.beep)
+
+    def run_on_device(self, callback, fn, *args, urgent=False):
+        # Queue fn on the device worker; callback(future) runs on the GUI thread.
+        # urgent work (writes) runs ahead of reads already queued
+        submit = self.device_worker.submit_urgent if urgent else self.device_worker.submit
+        future = submit(fn, *args)
+        future.add_done_callback(lambda f: self.device_events.done.emit(callback, f))
 
     def on_write_counter_changed(self, value):
         self.remaining_writes = int(value)
         self.remaining_writes_label.setText(f"Remaining writes: {self.remaining_writes}")
 
+    def load_jobs(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Load Jobs", "", "Job files (*.csv *.jsonl *.ndjson *.txt);;All files (*)"
+        )
+        if not path:
+            return
+        try:
+            # Rows the journal has as locked are skipped, so a batch cut short
+            # by a crash or sleep picks up where it stopped
+            self.job_batch = batch_id(path)
+            self.jobs = JobQueue.from_file(path, self.journal.finished_jobs(self.job_batch))
+            self.write_log(f"Loaded {self.jobs.total} job(s) from {path}")
+            if self.jobs.finished:
+                self.write_log(f"Resuming: {len(self.jobs.finished)} job(s) already written")
+        except Exception as e:
+            self.jobs = None
+            self.write_log(f"Error loading jobs: {str(e)}", ERROR)
+            QMessageBox.critical(self, "Error", str(e))
+        self.update_job_controls()
+
+    def skip_job(self):
+        job = self.jobs.peek() if self.jobs else None
+        if job:
+            self.jobs.skip(job)
+            self.journal.record(self.job_batch, job.index, "skipped", url=job.url)
+            self.write_log(f"Skipped job {job.index + 1}: {job.url}")
+        self.update_job_controls()
+
+    def retry_skipped_jobs(self):
+        if self.jobs:
+            self.write_log(f"Requeued {self.jobs.requeue_skipped()} skipped job(s)")
+        self.update_job_controls()
+
+    def clear_jobs(self):
+        self.stop_station()
+        self.jobs = None
+        self.url_input.setText("https://")
+        self.update_job_controls()
+
+    def update_job_controls(self):
+        job_mode = self.jobs is not None
+        for widget in (self.write_counter_label, self.write_counter_combo, self.remaining_writes_label):
+            widget.setVisible(not job_mode)
+        self.url_input.setReadOnly(job_mode)
+        self.skip_job_button.setEnabled(job_mode and not self.station)
+        self.station_button.setEnabled(job_mode)
+        self.retry_jobs_button.setEnabled(job_mode)
+        self.clear_jobs_button.setEnabled(job_mode)
+        self.job_progress.setVisible(job_mode)
+        if not job_mode:
+            self.job_status_label.setText("No job file loaded")
+            return
+
+        progress = self.jobs.progress()
+        total = progress["total"] or 0
+        finished = progress["written"] + progress["skipped"]
+        self.job_progress.setRange(0, max(total, 1))
+        self.job_progress.setValue(finished)
+        self.job_progress.setFormat(f"{finished} / {total}")
+        job = self.jobs.peek()
+        self.url_input.setText(job.url if job else "")
+        status = f"Written: {progress['written']}  Failed attempts: {progress['failed']}  Skipped: {progress['skipped']}"
+        self.job_status_label.setText(status if job else f"All jobs done. {status}")
+
+    def acr1252_readers(self, log):
+        # ACR-1252 readers, healthiest first, without quarantined ones
+        names = [name for name in self.reader_registry.names() if "ACR1252" in name]
+        ranked = self.health.rank(names)
+        for name in names:
+            if name not in ranked:
+                log(f"Reader quarantined after repeated failures: {name}", WARNING)
+        return ranked
+
+    def on_readers_changed(self, names):
+        # Handles to a reader that went away are dead even if it comes back
+        for name in self.known_readers - set(names):
+            self.device_worker.submit(self.connections.invalidate, name)
+            self.write_log(f"Reader removed: {name}", WARNING)
+        for name in set(names) - self.known_readers:
+            if self.known_readers:
+                self.write_log(f"Reader attached: {name}")
+        self.known_readers = set(names)
+        self.refresh_writers()
+        self.refresh_readers()
+        self.update_watched_readers()
+
+    def force_refresh_readers(self):
+        # Normally unnecessary; the registry tracks plug and unplug by itself
+        try:
+            self.on_readers_changed(self.reader_registry.refresh(notify=False))
+        except Exception as e:
+            self.write_log(f"Error refreshing readers: {str(e)}", ERROR)
+
     def refresh_writers(self):
         try:
-            reader_list = readers()
+            reader_list = self.acr1252_readers(self.write_log)
+            current = self.writer_combo.currentText()
             self.writer_combo.clear()
             for reader in reader_list:
-                if "ACR1252" in str(reader):  # Filter for ACR-1252 readers
-                    self.writer_combo.addItem(str(reader))
+                self.writer_combo.addItem(reader)
+            if current in reader_list:
+                self.writer_combo.setCurrentText(current)
             if self.writer_combo.count() > 0:
                 self.write_log("ACR-1252 readers refreshed successfully")
             else:
                 self.write_log("No ACR-1252 readers found")
         except Exception as e:
-            self.write_log(f"Error refreshing readers: {str(e)}")
+            self.write_log(f"Error refreshing readers: {str(e)}", ERROR)
 
     def refresh_readers(self):
         try:
-            reader_list = readers()
+            reader_list = self.acr1252_readers(self.read_log)
+            current = self.reader_combo.currentText()
             self.reader_combo.clear()
             for reader in reader_list:
-                if "ACR1252" in str(reader):  # Filter for ACR-1252 readers
-                    self.reader_combo.addItem(str(reader))
+                self.reader_combo.addItem(reader)
+            if current in reader_list:
+                self.reader_combo.setCurrentText(current)
             if self.reader_combo.count() > 0:
                 self.read_log("ACR-1252 readers refreshed successfully")
             else:
                 self.read_log("No ACR-1252 readers found")
         except Exception as e:
-            self.read_log(f"Error refreshing readers: {str(e)}")
+            self.read_log(f"Error refreshing readers: {str(e)}", ERROR)
+
+    def update_watched_readers(self):
+        # Station readers that are unplugged right now rejoin when they return
+        attached = set(self.reader_registry.names())
+        station_readers = [name for name in self.station.reader_names if name in attached] if self.station else []
+        self.card_monitor.watch([self.writer_combo.currentText(), self.reader_combo.currentText()] + station_readers)
+
+    def toggle_station(self):
+        if self.station:
+            self.stop_station()
+            return
+        if not self.jobs:
+            self.notify("warning", "No Jobs", "Load a job file before starting the station.")
+            return
+        names = [self.writer_combo.itemText(i) for i in range(self.writer_combo.count())]
+        if not names:
+            self.notify("warning", "No Readers", "No ACR-1252 readers found.")
+            return
+
+        options = dict(
+            verify=self.verify_checkbox.isChecked(), journal=self.journal, batch=self.job_batch,
+            locked_tags=self.locked_tags, health=self.health, on_status=self.station_events.status.emit,
+        )
+        if self.station_processes_checkbox.isChecked():
+            # Each process opens its own PC/SC context; simulated readers get a
+            # private copy that swaps its own tags
+            simulated = not isinstance(self.backend, PCSCBackend)
+            factory = simulated_backend if simulated else pcsc_backend
+            self.station = ProcessStation(factory, self.jobs, names, swap_tags=simulated, **options)
+            self.station.start()
+            self.station_timer.start()
+        else:
+            self.station = WriteStation(self.backend, self.jobs, names, arbiter=self.arbiter, **options)
+        for index, name in enumerate(names):
+            light = QLabel(str(index + 1))
+            light.setFixedSize(20, 20)
+            light.setToolTip(name)
+            light.setStyleSheet("background-color: red; border-radius: 10px;")
+            self.station_lights_layout.addWidget(light)
+            self.station_lights[name] = light
+        # The station owns these readers now; tags already on them are not written
+        self.write_button.setEnabled(False)
+        self.station_button.setText("Stop Station")
+        self.station_processes_checkbox.setEnabled(False)
+        self.update_watched_readers()
+        self.update_job_controls()
+        self.write_log(f"Station started on {len(names)} reader(s), place tags to write them")
+
+    def stop_station(self, wait=False):
+        if not self.station:
+            return
+        station, self.station = self.station, None
+        self.station_timer.stop()
+        # Readers wind down on their own threads; only closing waits, so the
+        # last tag's states reach the journal before it closes
+        station.stop(wait=wait)
+        for light in self.station_lights.values():
+            self.station_lights_layout.removeWidget(light)
+            light.deleteLater()
+        self.station_lights = {}
+        self.write_button.setEnabled(True)
+        self.station_button.setText("Start Station")
+        self.station_processes_checkbox.setEnabled(True)
+        self.update_watched_readers()
+        self.update_job_controls()
+        self.write_log("Station stopped")
+        self.log_session_stats()
+
+    def log_session_stats(self):
+        # Counters kept since start-up: reconnect storms, cache hit rates and
+        # per-reader health are what to look at after a long session
+        churn = self.connections.churn()
+        self.write_log("Connections: {} opened, {} reused, {} dropped", INFO,
+                       churn["connects"], churn["reuses"], churn["disconnects"])
+        self.write_log("Read cache: {} hit(s), {} miss(es); locked-tag cache: {} hit(s), {} miss(es)", INFO,
+                       self.read_cache.hits, self.read_cache.misses, self.locked_tags.hits, self.locked_tags.misses)
+        for name, health in self.health.snapshot().items():
+            self.write_log("{}: {} tag(s), {} ms/APDU, error rate {}, {} verify retries{}", INFO,
+                           name, health["samples"], health["ms_per_apdu"] or "-", health["error_rate"], health["retries"],
+                           ", quarantined" if health["quarantined"] else "")
+
+    def poll_station(self):
+        if not self.station:
+            return
+        counters = self.station.counters()
+        for name, status in self.station.statuses().items():
+            light = self.station_lights[name]
+            light.setStyleSheet(f"background-color: {STATION_COLORS[status]}; border-radius: 10px;")
+            light.setToolTip(f"{name}\n{status}, written {counters[name]['written']}, errors {counters[name]['errors']}")
+
+    def on_station_status(self, reader_name, status, detail):
+        light = self.station_lights.get(reader_name)
+        if not light:
+            return  # A late status from a station that was just stopped
+        light.setStyleSheet(f"background-color: {STATION_COLORS[status]}; border-radius: 10px;")
+        number = light.text()
+        if status == DONE:
+            self.write_log("Reader {}: job {} written, remove the tag", INFO, number, detail.index + 1)
+        elif status == FAILED:
+            self.write_log("Reader {}: {}", ERROR, number, detail)
+        elif status == FINISHED:
+            self.write_log("Reader {}: no jobs left", INFO, number)
+        elif status == QUARANTINED:
+            self.write_log("Reader {}: quarantined after repeated failures, remove the tag", WARNING, number)
+        if status in (DONE, FAILED):
+            # The station may have just rewritten a tag the Read tab has cached;
+            # the cache belongs to the device worker, so clear it there
+            self.device_worker.submit(self.read_cache.clear)
+            self.update_job_controls()
+            if self.jobs and self.jobs.done():
+                self.notify("information", "Jobs Done", "Every job in the queue has been written.")
+
+    def on_card_event(self, reader_name, present):
+        if self.station and reader_name in self.station.workers:
+            # Handled on the station's own worker for that reader
+            self.station.on_card_event(reader_name, present)
+            return
+        # Any insertion or removal makes the old handle stale; queued ahead of
+        # the handlers below so they reconnect exactly once
+        self.device_worker.submit(self.connections.invalidate, reader_name)
+        if reader_name == self.writer_combo.currentText():
+            self.check_for_write_card(present)
+        if reader_name == self.reader_combo.currentText():
+            self.check_for_read_card(present)
+
+    def check_for_write_card(self, present):
+        if present:
+            self.run_on_device(self.on_write_card_checked, self.probe_write_card, self.writer_combo.currentText(),
+                               self.auto_checkbox.isChecked())
+        else:
+            self.set_write_card_ready(False)
+
+    def probe_write_card(self, reader_name, check_lock):
+        # (connected, locked); only auto mode pays for the lock check, so a
+        # tag that was just written and is put back isn't written again
+        if not self.connect_write_reader(reader_name):
+            return False, False
+        if not check_lock:
+            return True, False
+        try:
+            with self.arbiter.session(reader_name):
+                tag = TagIO(self.write_connection, self.fast_read_supported.get(reader_name, True), self.tracer(self.write_log))
+                uid = tag.get_uid()
+                if self.locked_tags.get(uid):
+                    return True, True
+                return True, any_lock_bits(tag, self.tag_profiles.lookup(tag, uid))
+        except Exception:
+            return True, False  # Let the write itself report what is wrong with the tag
+
+    def on_write_card_checked(self, future):
+        if future.exception():
+            self.write_log(f"Error checking for card: {str(future.exception())}", ERROR)
+        else:
+            self.set_write_card_ready(*future.result())
 
-    def check_for_write_card(self):
+    def set_write_card_ready(self, ready, locked=False):
         try:
-            if self.connect_write_reader():
+            if ready:
                 if not self.card_detected:
                     self.card_detected = True
                     self.write_status_light.setStyleSheet("background-color: green; border-radius: 10px;")
                     self.write_log("Card detected and ready")
+                    if self.auto_checkbox.isChecked() and self.auto_armed:
+                        self.auto_armed = False
+                        if locked:
+                            # Auto mode only writes blank tags; no job is taken
+                            self.write_log("Tag is already locked, not writing it", WARNING)
+                        else:
+                            self.write_and_lock_url()
             else:
+                self.auto_armed = True
                 if self.card_detected:
                     self.card_detected = False
                     self.write_status_light.setStyleSheet("background-color: red; border-radius: 10px;")
                     self.write_log("Card removed")
         except Exception as e:
-            self.write_log(f"Error checking for card: {str(e)}")
+            self.write_log(f"Error checking for card: {str(e)}", ERROR)
+
+    def toggle_auto_write(self, enabled):
+        # Never write a tag that was already on the reader when auto mode was
+        # switched on; it may be the one that was just written
+        self.auto_armed = not self.card_detected
+        self.write_log("Auto-write enabled, place a tag to write it" if enabled else "Auto-write disabled")
 
     def toggle_reader(self):
         if self.reader_active:
             self.reader_active = False
             self.read_toggle_button.setText("Start Reader")
-            self.read_card_timer.stop()
             self.read_status_light.setStyleSheet("background-color: red; border-radius: 10px;")
             self.url_display.clear()
             self.read_log("Reader stopped")
         else:
             self.reader_active = True
             self.read_toggle_button.setText("Stop Reader")
-            self.read_card_timer.start()
             self.read_log("Reader started")
+            # A tag may already be sitting on the reader
+            self.check_for_read_card(self.card_monitor.is_present(self.reader_combo.currentText()))
 
-    def check_for_read_card(self):
+    def check_for_read_card(self, present):
         if not self.reader_active:
             return
-            
-        try:
-            if self.connect_read_reader():
-                self.read_status_light.setStyleSheet("background-color: green; border-radius: 10px;")
-                self.read_tag()
-            else:
-                self.read_status_light.setStyleSheet("background-color: red; border-radius: 10px;")
-                self.url_display.clear()
-        except Exception as e:
-            self.read_log(f"Error checking for card: {str(e)}")
 
-    def connect_write_reader(self):
+        if present:
+            self.run_on_device(self.on_read_card_checked, self.read_tag, self.reader_combo.currentText())
+        else:
+            self.read_status_light.setStyleSheet("background-color: red; border-radius: 10px;")
+            self.url_display.clear()
+
+    def on_read_card_checked(self, future):
+        if future.exception():
+            self.read_log(f"Error checking for card: {str(future.exception())}", ERROR)
+            return
+        connected, url = future.result()
+        if not connected or not self.reader_active:
+            return
+        self.read_status_light.setStyleSheet("background-color: green; border-radius: 10px;")
+        if url and self.url_display.text() != url:
+            self.url_display.setText(url)
+            self.read_log(f"URL detected: {url}")
+            try:
+                webbrowser.get('google-chrome').open(url)
+            except Exception as e:
+                self.read_log(f"Error opening browser: {str(e)}", ERROR)
+
+    # Everything below that touches a connection runs on the device worker thread
+
+    def connect_write_reader(self, reader_name):
         try:
-            if not self.writer_combo.currentText():
+            if not reader_name:
                 return False
-            r = readers()
-            self.writer = [reader for reader in r if str(reader) == self.writer_combo.currentText()][0]
-            self.write_connection = self.writer.createConnection()
-            self.write_connection.connect()
+            self.write_connection = self.connections.get(reader_name)
             return True
         except Exception as e:
             return False
 
-    def connect_read_reader(self):
+    def connect_read_reader(self, reader_name):
         try:
-            if not self.reader_combo.currentText():
+            if not reader_name:
                 return False
-            r = readers()
-            self.reader = [reader for reader in r if str(reader) == self.reader_combo.currentText()][0]
-            self.read_connection = self.reader.createConnection()
-            self.read_connection.connect()
+            self.read_connection = self.connections.get(reader_name)
             return True
         except Exception as e:
             return False
 
-    def _write_data(self, page, data):
-        while len(data) < 4:
-            data.append(0x00)
-        apdu = [0xFF, 0xD6, 0x00, page] + [len(data)] + data
-        response, sw1, sw2 = self.write_connection.transmit(apdu)
-        if not (sw1 == 0x90 and sw2 == 0x00):
-            raise Exception(f"Write failed at page {page}: {hex(sw1)} {hex(sw2)}")
-
-    def _read_data(self, page):
-        apdu = [0xFF, 0xB0, 0x00, page, 0x04]
-        response, sw1, sw2 = self.read_connection.transmit(apdu)
-        if not (sw1 == 0x90 and sw2 == 0x00):
-            raise Exception(f"Read failed at page {page}: {hex(sw1)} {hex(sw2)}")
-        return response
-
-    def read_tag(self):
-        try:
-            # Read capability container
-            cc = self._read_data(3)
-            if cc[0] != 0xE1:  # Check if tag is NDEF formatted
-                self.read_log("Tag is not NDEF formatted")
-                return
-
-            # Read first page to get length
-            first_chunk = self._read_data(4)
-            self.read_log(f"First page data: {' '.join([hex(x) for x in first_chunk])}")
-            
-            # Skip proprietary header and find NDEF message
-            # First byte (0x01) is proprietary, followed by NDEF TLV (0x03)
-            if first_chunk[1] != 0x03:  # NDEF message TLV tag
-                self.read_log(f"NDEF TLV tag not found where expected")
-                return
-
-            # Read data page by page until we find the NDEF record and terminator
-            ndef_data = first_chunk
-            found_d1 = False
-            current_page = 5  # Start from page 5 since we already have page 4
-            
-            while current_page <= 39:  # NTAG215 has 40 pages (0-39) with last page reserved for lock bytes
-                chunk = self._read_data(current_page)
-                self.read_log(f"Read page {current_page}: {' '.join([hex(x) for x in chunk])}")
-                ndef_data.extend(chunk)
-                
-                # Check if we found the NDEF record header (0xD1)
-                if not found_d1 and 0xD1 in chunk:
-                    found_d1 = True
-                
-                # If we found the terminator after finding 0xD1, we're done
-                if found_d1 and 0xFE in chunk:
-                    break
-                    
-                current_page += 1
-            
-            # Trim data at terminator
-            if 0xFE in ndef_data:
-                terminator_index = ndef_data.index(0xFE)
-                ndef_data = ndef_data[:terminator_index + 1]
-            
-            self.read_log(f"Trimmed NDEF data: {' '.join([hex(x) for x in ndef_data])}")
-
-            # Find NDEF record in the data (should start with 0xD1)
-            ndef_start = 3  # NDEF record starts after TLV tag and length
-            if ndef_data[ndef_start] != 0xD1:  # NDEF header (MB=1, ME=1, SR=1, TNF=1)
-                self.read_log(f"Invalid NDEF header: {hex(ndef_data[ndef_start])}")
-                return
-
-            self.read_log(f"Found NDEF record at offset: {ndef_start}")
-
-            # Parse record header
-            type_length = ndef_data[ndef_start + 1]
-            payload_length = ndef_data[ndef_start + 2]
-            record_offset = ndef_start + 3
-
-            self.read_log(f"Type length: {type_length}, Payload length: {payload_length}")
-
-            # Verify URI record type
-            if ndef_data[record_offset] != 0x55:  # 'U' type
-                self.read_log(f"Not a URI record: {hex(ndef_data[record_offset])}")
-                return
-
-            # Get URL prefix and data
-            prefix_code = ndef_data[record_offset + 1]
-            url_start = record_offset + 2
-
-            self.read_log(f"URL prefix code: {hex(prefix_code)}")
-
-            # Handle different URL prefixes
-            prefix_map = {
-                0x00: "",           # No prefix
-                0x01: "http://www.",
-                0x02: "https://www.",
-                0x03: "http://",
-                0x04: "https://"
-            }
-            
-            if prefix_code in prefix_map:
-                # URL length is payload_length - 1 (subtract prefix byte)
-                url_bytes = ndef_data[url_start:url_start + payload_length - 1]
-                url = prefix_map[prefix_code] + bytes(url_bytes).decode('utf-8')
-                
-                self.read_log(f"Extracted URL bytes: {' '.join([hex(x) for x in url_bytes])}")
-                
-                if self.url_display.text() != url:
-                    self.url_display.setText(url)
-                    self.read_log(f"URL detected: {url}")
-                    webbrowser.get('google-chrome').open(url)
-            else:
-                self.read_log(f"Unsupported URL prefix code: {hex(prefix_code)}")
-
-        except Exception as e:
-            self.read_log(f"Error reading tag: {str(e)}")
-
-    def create_ndef_url(self, url):
-        url = url.lower().replace('https://', '').replace('http://', '')
-        url_bytes = url.encode()
-        url_length = len(url_bytes)
-        
-        # Calculate total NDEF message length (including all headers)
-        ndef_length = url_length + 5  # URL + NDEF header(1) + type length(1) + payload length(1) + type(1) + prefix(1)
-        
-        # Use extended length format for larger payloads
-        if ndef_length > 254:
-            message = [
-                0x01,  # Proprietary header
-                0x03,  # NDEF message TLV tag
-                0xFF,  # Extended length marker
-                (ndef_length >> 8) & 0xFF,  # Length high byte
-                ndef_length & 0xFF,         # Length low byte
-                0xD1,  # NDEF header (MB=1, ME=1, SR=1, TNF=1)
-                0x01,  # Type length (1 byte for 'U')
-                url_length + 1,  # Payload length (URL + prefix byte)
-                0x55,  # 'U' type
-                0x04,  # https:// prefix
-            ]
-        else:
-            message = [
-                0x01,  # Proprietary header
-                0x03,  # NDEF message TLV tag
-                ndef_length,  # Length
-                0xD1,  # NDEF header (MB=1, ME=1, SR=1, TNF=1)
-                0x01,  # Type length (1 byte for 'U')
-                url_length + 1,  # Payload length (URL + prefix byte)
-                0x55,  # 'U' type
-                0x04,  # https:// prefix
-            ]
-        
-        # Add URL and terminator
-        message.extend(url_bytes)
-        message.append(0xFE)  # TLV terminator
-        
-        return message
-
-    def lock_tag(self):
+    def read_tag(self, reader_name):
+        # Returns (connected, url); url is None if the tag could not be parsed
+        if not self.connect_read_reader(reader_name):
+            return False, None
         try:
-            static_lock_bytes = [0xFF, 0xFF, 0xFF, 0xFF]
-            self._write_data(2, static_lock_bytes)
+            # Reads yield to a write in flight or queued on the same reader
+            with self.arbiter.session(reader_name):
+                # Parse the NDEF TLV length from the first pages, then fetch exactly
+                # the pages the message occupies in one planned batch
+                tag = TagIO(self.read_connection, self.fast_read_supported.get(reader_name, True), self.tracer(self.read_log))
+                # The UID costs one APDU; a tag seen before is not read again
+                uid = tag.get_uid()
+                # Locked tags can't change under us, so they are checked first
+                locked = self.locked_tags.get(uid)
+                if locked:
+                    self.read_log("Locked tag {}: URL from cache", INFO, uid)
+                    return True, locked[0]
+                cached = self.read_cache.get(uid)
+                if cached:
+                    return True, cached[1]
+
+                profile = self.tag_profiles.lookup(tag, uid)
+                cc, ndef_data = read_ndef_message(tag, profile.user_end)
+                self.fast_read_supported[reader_name] = tag.fast_read_supported
+                self.read_log("{}: read NDEF message in {} exchange(s)", INFO, profile.name, tag.apdus)
+
+                if cc[0] != 0xE1:  # Check if tag is NDEF formatted
+                    self.read_log("Tag is not NDEF formatted")
+                    return True, None
+
+                if not ndef_data:
+                    self.read_log("No NDEF message on tag")
+                    return True, None
+
+                self.read_log("NDEF message: {}", DEBUG, ndef_data)
+
+                records = decode_message(ndef_data)
+                record = records[0]
+                self.read_log("Found {} record(s), payload length: {}", DEBUG, len(records), len(record.payload))
+
+                # Verify URI record type
+                if not is_uri_record(record):
+                    self.read_log(f"Not a URI record: {bytes(record.type)}")
+                    return True, None
+
+                url = decode_uri(record.payload)
+                self.read_log("URL prefix code: {}", DEBUG, record.payload[:1])
+                # Blank and foreign tags aren't cached: they are the ones that get written next
+                self.read_cache.put(uid, (profile, url))
+                # Two more reads, once per tag, so it never has to be read again
+                if is_locked(tag, profile):
+                    self.locked_tags.put(uid, url, profile.name)
+                return True, url
 
-            dynamic_lock_bytes = [0xFF, 0xFF, 0xFF, 0xFF]
-            self._write_data(40, dynamic_lock_bytes)
-
-            self.write_log("Tag locked successfully")
         except Exception as e:
-            self.write_log(f"Warning: Could not lock tag - {str(e)}")
+            self.connections.invalidate(reader_name)
+            self.read_log(f"Error reading tag: {str(e)}", ERROR)
+            return True, None
 
     def write_and_lock_url(self):
         if not self.card_detected:
-            QMessageBox.warning(self, "No Card", "Please place an NFC tag on the reader before writing.")
+            self.notify("warning", "No Card", "Please place an NFC tag on the reader before writing.")
             return
 
-        try:
-            url = self.url_input.text()
-            # Check if URL is just http:// or https://
-            if url.lower() in ['http://', 'https://']:
-                QMessageBox.warning(self, "Invalid URL", "Please enter a complete URL after http:// or https://")
-                return
-                
-            if not url.startswith(('http://', 'https://')):
-                QMessageBox.warning(self, "Invalid URL", "URL must start with http:// or https://")
+        job = None
+        if self.jobs:
+            # Every placed tag gets the next pending job's URL
+            job = self.jobs.take()
+            if job is None:
+                self.notify("information", "Jobs Done", "Every job in the queue has been written.")
                 return
 
-            if not self.connect_write_reader():
+        try:
+            url = job.url if job else self.url_input.text()
+            try:
+                normalize_url(url)
+            except InvalidURL as e:
+                if job:
+                    self.skip_invalid_job(job)
+                self.notify("warning", "Invalid URL", str(e))
                 return
 
-            if self.remaining_writes <= 0:
+            if not job and self.remaining_writes <= 0:
                 self.reset()
-                QMessageBox.warning(self, "Write Limit Reached", "Maximum number of writes reached. Settings have been reset.")
+                self.notify("warning", "Write Limit Reached", "Maximum number of writes reached. Settings have been reset.")
                 return
+        except Exception as e:
+            if job:
+                self.fail_job(job, e)
+            self.write_log(f"Error: {str(e)}", ERROR)
+            self.notify("critical", "Error", str(e))
+            return
 
-            self.write_log("Writing URL...")
-
-            ndef_data = self.create_ndef_url(url)
-            self.write_log("NDEF data: " + " ".join([hex(x) for x in ndef_data]))
-
-            cc_data = [0xE1, 0x10, 0x6D, 0x00]
-            self._write_data(3, cc_data)
-
-            page = 4
-            chunk_size = 4
-            for i in range(0, len(ndef_data), chunk_size):
-                chunk = ndef_data[i:i + chunk_size]
-                self._write_data(page, chunk)
-                page += 1
-
-                if page > 39:  # NTAG215 has 40 pages (0-39) with last page reserved for lock bytes
-                    raise Exception("URL too long for tag capacity")
-
-            self.lock_tag()
+        record = None
+        if job:
+            self.journal.record(self.job_batch, job.index, "writing", url=url)
+            record = partial(self.journal.record, self.job_batch, job.index)
+
+        # Keep the button disabled while the multi-page write is in flight
+        self.write_button.setEnabled(False)
+        self.write_status_light.setStyleSheet("background-color: yellow; border-radius: 10px;")
+        self.run_on_device(partial(self.on_write_finished, job=job), self.write_tag, self.writer_combo.currentText(),
+                           url, self.verify_checkbox.isChecked(), record, urgent=True)
+
+    def fail_job(self, job, exception):
+        error = str(exception)
+        self.journal.record(self.job_batch, job.index, "failed", url=job.url, error=error)
+        if fault_of(exception) == TAG_FAULT:
+            self.jobs.release(job, error)  # Locked or not an NTAG; the job isn't to blame
+        elif self.jobs.fail(job, error):
+            self.journal.record(self.job_batch, job.index, "skipped", url=job.url, error=error)
+            self.write_log(f"Skipped job {job.index + 1} after {job.attempts} failed attempts: {job.url}", WARNING)
+        self.update_job_controls()
+
+    def skip_invalid_job(self, job):
+        self.jobs.skip(job)
+        self.journal.record(self.job_batch, job.index, "skipped", url=job.url, error="Invalid URL")
+        self.write_log(f"Skipped job {job.index + 1}, invalid URL: {job.url}")
+        self.update_job_controls()
+
+    def write_tag(self, reader_name, url, verify=True, record=None):
+        # record(state, ...) journals the job's progress without blocking
+        if not self.connect_write_reader(reader_name):
+            raise Exception("Could not connect to the tag")
+
+        start = time.perf_counter()
+        try:
+            # Exclusive for the whole write, verify and lock sequence
+            with self.arbiter.session(reader_name, write=True):
+                self.write_log("Writing URL...")
+                tag = TagIO(self.write_connection, self.fast_read_supported.get(reader_name, True), self.tracer(self.write_log))
+                uid = tag.get_uid()
+                self.read_cache.discard(uid)  # Whatever was read from it is about to change
+
+                # Same differential write, verify and lock as the stations;
+                # a tag that can't be locked raises, so the job isn't finished
+                done = write_job(tag, self.tag_profiles, url, verify, True, record, uid)
+                result = done.write
+                self.fast_read_supported[reader_name] = tag.fast_read_supported
+                self.write_log("Tag type: {}", INFO, done.profile.name)
+                self.write_log("Wrote {} of {} pages, saved {} APDU(s)", INFO, len(result.plan.writes), len(result.plan.image), result.saved)
+                if result.retried:
+                    self.write_log(f"Verify: rewrote page(s) {', '.join(str(page) for page in result.retried)}")
+                if verify:
+                    self.write_log("Verify OK")
+                self.write_log("Tag locked successfully")
+
+                self.locked_tags.put(done.uid, done.url, done.profile.name)
+                self.health.record(reader_name, True, time.perf_counter() - start, tag.apdus, len(result.retried))
+        except Exception as e:
+            # Don't reuse a handle that just failed mid-write
+            self.connections.invalidate(reader_name)
+            # Tag and job faults (too long, locked, not an NTAG) aren't the reader's
+            if fault_of(e) == READER_FAULT and self.health.record(reader_name, False):
+                self.write_log(f"Reader quarantined after repeated failures: {reader_name}", WARNING)
+            raise
+
+    def on_write_finished(self, future, job=None):
+        self.write_button.setEnabled(True)
+        try:
+            if future.exception():
+                if job:
+                    self.fail_job(job, future.exception())
+                raise future.exception()
+
+            if job:
+                self.jobs.complete(job)
+                self.update_job_controls()
+                self.write_status_light.setStyleSheet("background-color: orange; border-radius: 10px;")
+                self.write_log(f"Job {job.index + 1} written. You can now remove the card.")
+                if self.jobs.peek() is None:
+                    self.notify("information", "Success", "URL written and tag locked successfully! All jobs done.")
+                else:
+                    self.notify("information", "Success", f"URL written and tag locked successfully! Next: {self.jobs.peek().url}")
+                return
 
             # Update remaining writes counter
             self.remaining_writes -= 1
@@ -479,19 +880,20 @@ class NFCApp(QMainWindow):
             if self.remaining_writes > 0:
                 self.write_status_light.setStyleSheet("background-color: orange; border-radius: 10px;")
                 self.write_log("Tag locked. You can now remove the card.")
-                QMessageBox.information(self, "Success", f"URL written and tag locked successfully! {self.remaining_writes} writes remaining.")
+                self.notify("information", "Success", f"URL written and tag locked successfully! {self.remaining_writes} writes remaining.")
             else:
                 self.reset()
-                QMessageBox.information(self, "Success", "URL written and tag locked successfully! Maximum writes reached, settings reset.")
+                self.notify("information", "Success", "URL written and tag locked successfully! Maximum writes reached, settings reset.")
 
         except Exception as e:
-            self.write_log(f"Error: {str(e)}")
-            QMessageBox.critical(self, "Error", str(e))
-        finally:
-            if self.write_connection:
-                self.write_connection.disconnect()
+            self.write_status_light.setStyleSheet("background-color: purple; border-radius: 10px;")
+            self.write_log(f"Error: {str(e)}", ERROR)
+            self.notify("critical", "Error", str(e))
 
     def reset(self):
+        self.stop_station()
+        self.jobs = None
+        self.update_job_controls()
         self.url_input.setText("https://")
         self.write_status_log.clear()
         self.card_detected = False
@@ -499,10 +901,24 @@ class NFCApp(QMainWindow):
         self.remaining_writes = int(self.write_counter_combo.currentText())
         self.remaining_writes_label.setText(f"Remaining writes: {self.remaining_writes}")
         self.write_log("Reset complete")
+        self.log_session_stats()
+        # No poll will rediscover a tag that is still on the reader, so resync now
+        self.check_for_write_card(self.card_monitor.is_present(self.writer_combo.currentText()))
+
+    def closeEvent(self, event):
+        self.reader_registry.stop()
+        self.card_monitor.stop()
+        self.stop_station(wait=True)
+        self.device_worker.submit(self.connections.close_all)
+        self.device_worker.stop()
+        self.journal.close()
+        self.locked_tags.close()
+        super().closeEvent(event)
 
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    window = NFCApp()
+    # NFC_SIMULATE=N runs against N simulated readers instead of PC/SC
+    window = NFCApp(backend_from_env())
     window.show()
     sys.exit(app.exec())
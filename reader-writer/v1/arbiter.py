@@ -0,0 +1,70 @@
+"""Device arbiter: one owner per physical reader.
+
+Everything that talks to a tag, whether the Read tab, the Write tab or a
+station worker, opens a session on the reader first. Sessions share the one
+cached connection per reader and hold a PC/SC transaction
+(SCardBeginTransaction) for their duration, so no other thread, process or
+application can interleave APDUs with them. Write sessions take priority: a
+read waits while a write is running or queued for that reader, and a write
+never waits behind more than the read already in progress.
+"""
+from contextlib import contextmanager
+import threading
+
+from connections import ConnectionManager
+
+
+class PriorityLock:
+    """Exclusive lock that lets waiting writers in ahead of waiting readers."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.held = False
+        self.writers_waiting = 0
+
+    def acquire(self, write=False):
+        with self.condition:
+            if write:
+                self.writers_waiting += 1
+                try:
+                    self.condition.wait_for(lambda: not self.held)
+                finally:
+                    self.writers_waiting -= 1
+            else:
+                self.condition.wait_for(lambda: not self.held and not self.writers_waiting)
+            self.held = True
+
+    def release(self):
+        with self.condition:
+            self.held = False
+            self.condition.notify_all()
+
+
+class ReaderArbiter:
+    def __init__(self, backend, connections=None):
+        self.backend = backend
+        self.connections = connections or ConnectionManager(backend)
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def _reader_lock(self, reader_name):
+        with self.lock:
+            return self.locks.setdefault(reader_name, PriorityLock())
+
+    @contextmanager
+    def session(self, reader_name, write=False):
+        """Exclusive use of reader_name's connection, inside a PC/SC transaction."""
+        reader_lock = self._reader_lock(reader_name)
+        reader_lock.acquire(write)
+        try:
+            connection = self.connections.get(reader_name)
+            self.backend.begin_transaction(connection)
+            try:
+                yield connection
+            finally:
+                try:
+                    self.backend.end_transaction(connection)
+                except Exception:
+                    pass  # The card was removed; the transaction went with it
+        finally:
+            reader_lock.release()
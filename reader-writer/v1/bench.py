@@ -0,0 +1,231 @@
+"""End-to-end write and read benchmark against simulated readers.
+
+    python bench.py --tags 50 --latency 0.004 --output results.json
+    python bench.py --station 1 2 4 --tags 200 [--processes]
+
+Drives the same write (plan, write, verify, lock) and read (profile, TLV
+driven read, decode) flows as the GUI, headlessly, for every tag type and a
+range of URL lengths. Reports tags per minute, p50/p95/p99 per-tag latency,
+APDUs per tag and bytes on the wire, and stores everything as JSON so runs
+can be compared. Tag swap time is not included.
+
+With --station, runs the multi-reader write station instead: a simulated
+operator swaps tags on every reader as soon as it reports done, and the
+throughput for each reader count shows how well the station scales.
+--processes runs one process per reader instead of one thread per reader.
+"""
+import argparse
+from functools import partial
+import json
+import platform
+import threading
+import time
+
+from ndef import encode_url, decode_url
+from ntag import NTAG213, NTAG215, NTAG216, TagIO, ProfileCache, user_capacity, write_job, read_ndef_message
+from simulator import SimulatedBackend, SimulatedTag, DEFAULT_READER, reader_name
+from jobs import JobQueue
+from pcsc import CardMonitor
+from station import WriteStation, IDLE, DONE, FAILED
+from procstation import ProcessStation, simulated_backend
+
+URL_LENGTHS = (10, 25, 50, 100, 200, 400, 800)
+PROFILES = {"NTAG213": NTAG213, "NTAG215": NTAG215, "NTAG216": NTAG216}
+
+
+def make_url(length, index):
+    """A URL of exactly length characters, unique per index.
+
+    The index goes in base 36 right after the scheme and "-" (not a base 36
+    digit) pads the rest, so even 10-character URLs stay unique.
+    """
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    name, rest = digits[index % 36], index // 36
+    while rest:
+        name, rest = digits[rest % 36] + name, rest // 36
+    url = "https://" + name
+    if len(url) > length:
+        raise Exception(f"{length} characters can't hold a URL for tag {index}")
+    return url + "-" * (length - len(url))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarise(latencies, apdus, bytes_on_wire):
+    count = len(latencies)
+    mean = sum(latencies) / count
+    return {
+        "tags": count,
+        "tags_per_minute": round(60 / mean, 1) if mean else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "apdus_per_tag": round(apdus / count, 2),
+        "bytes_per_tag": round(bytes_on_wire / count, 1),
+    }
+
+
+def run_case(profile, url_length, tags, args):
+    backend = SimulatedBackend(latency=args.latency, byte_latency=args.byte_latency,
+                               direct_transmit=not args.no_direct_transmit)
+    reader = backend.readers[DEFAULT_READER]
+    profiles = ProfileCache()
+    write_times, read_times = [], []
+    write_apdus = read_apdus = write_bytes = read_bytes = 0
+    fast_read = True  # Learned once per reader, as the GUI does
+
+    for index in range(tags):
+        url = make_url(url_length, index)
+        backend.insert(SimulatedTag(profile))
+
+        reader.reset_counters()
+        start = time.perf_counter()
+        tag = TagIO(backend.connect(DEFAULT_READER), fast_read)
+        write_job(tag, profiles, url, verify=not args.no_verify)
+        write_times.append(time.perf_counter() - start)
+        fast_read = tag.fast_read_supported
+        write_apdus += reader.apdus
+        write_bytes += reader.bytes_sent + reader.bytes_received
+
+        # Read it back as a fresh scan, with no profile cached for this UID
+        reader.reset_counters()
+        start = time.perf_counter()
+        tag = TagIO(backend.connect(DEFAULT_READER), fast_read)
+        tag_profile = ProfileCache().lookup(tag)
+        cc, message = read_ndef_message(tag, tag_profile.user_end)
+        if decode_url(message) != url:
+            raise Exception(f"Read back mismatch on {profile.name} for {url}")
+        read_times.append(time.perf_counter() - start)
+        read_apdus += reader.apdus
+        read_bytes += reader.bytes_sent + reader.bytes_received
+
+        backend.remove()
+
+    return {
+        "write": summarise(write_times, write_apdus, write_bytes),
+        "read": summarise(read_times, read_apdus, read_bytes),
+    }
+
+
+def run_station(readers, tags, args):
+    names = [reader_name(i) for i in range(readers)]
+    backend = SimulatedBackend(names, latency=args.latency, byte_latency=args.byte_latency,
+                               direct_transmit=not args.no_direct_transmit)
+    jobs = JobQueue([make_url(50, i) for i in range(tags)], tags)
+    finished = threading.Event()
+
+    def operator(name, status, detail):
+        # Runs on the reader's worker: swap the tag as soon as it is done
+        if status in (DONE, FAILED):
+            if jobs.done():
+                finished.set()
+            backend.remove(name)
+        elif status == IDLE and jobs.peek() is not None:
+            backend.insert(SimulatedTag(NTAG215), name)
+
+    station = WriteStation(backend, jobs, names, verify=not args.no_verify, on_status=operator)
+    monitor = CardMonitor(backend, station.on_card_event)
+    monitor.watch(names)
+    start = time.perf_counter()
+    monitor.start()
+    for name in names:
+        backend.insert(SimulatedTag(NTAG215), name)
+    finished.wait()
+    elapsed = time.perf_counter() - start
+    monitor.stop()
+    station.stop()
+    return {
+        "readers": readers,
+        "tags": jobs.written,
+        "failed": jobs.failed,
+        "seconds": round(elapsed, 3),
+        "tags_per_minute": round(jobs.written / elapsed * 60, 1),
+    }
+
+
+def run_process_station(readers, tags, args):
+    names = [reader_name(i) for i in range(readers)]
+    jobs = JobQueue([make_url(50, i) for i in range(tags)], tags)
+    finished = threading.Event()
+
+    def on_status(name, status, detail):
+        if status in (DONE, FAILED) and jobs.done():
+            finished.set()
+
+    # Every process has a private simulated reader and swaps its own tags
+    factory = partial(simulated_backend, latency=args.latency, byte_latency=args.byte_latency)
+    station = ProcessStation(factory, jobs, names, verify=not args.no_verify, swap_tags=True, on_status=on_status)
+    station.start()
+    start = time.perf_counter()
+    finished.wait()
+    elapsed = time.perf_counter() - start
+    station.stop()
+    return {
+        "readers": readers,
+        "processes": True,
+        "tags": jobs.written,
+        "failed": jobs.failed,
+        "seconds": round(elapsed, 3),
+        "tags_per_minute": round(jobs.written / elapsed * 60, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark write and read flows on simulated readers")
+    parser.add_argument("--tags", type=int, default=20, help="tags per case")
+    parser.add_argument("--latency", type=float, default=0.004, help="seconds per APDU")
+    parser.add_argument("--byte-latency", type=float, default=0.00005, help="extra seconds per APDU byte sent")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--lengths", nargs="+", type=int, default=list(URL_LENGTHS))
+    parser.add_argument("--no-verify", action="store_true")
+    parser.add_argument("--no-direct-transmit", action="store_true", help="simulate a reader without FAST_READ")
+    parser.add_argument("--station", nargs="+", type=int, metavar="READERS",
+                        help="benchmark the write station with these reader counts instead")
+    parser.add_argument("--processes", action="store_true", help="run the station with one process per reader")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {
+        "settings": {
+            "tags": args.tags, "latency": args.latency, "byte_latency": args.byte_latency,
+            "verify": not args.no_verify, "direct_transmit": not args.no_direct_transmit,
+            "python": platform.python_version(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "cases": [],
+        "skipped": [],  # (profile, url_length) pairs that were not run, and why
+    }
+    for readers in args.station or ():
+        case = (run_process_station if args.processes else run_station)(readers, args.tags, args)
+        results["cases"].append(case)
+        print(f"{readers} reader(s)  {case['tags']} tags in {case['seconds']:.2f} s  "
+              f"{case['tags_per_minute']:8.1f}/min")
+    for name in [] if args.station else args.profiles:
+        profile = PROFILES[name]
+        for length in args.lengths:
+            try:
+                url = make_url(length, args.tags - 1)
+                if len(encode_url(url)) > user_capacity(profile):
+                    raise Exception(f"URL doesn't fit in {user_capacity(profile)} bytes")
+            except Exception as e:
+                results["skipped"].append({"profile": name, "url_length": length, "reason": str(e)})
+                print(f"{name} {length:4d} B  skipped: {e}")
+                continue
+            case = run_case(profile, length, args.tags, args)
+            case.update({"profile": name, "url_length": length})
+            results["cases"].append(case)
+            write, read = case["write"], case["read"]
+            print(f"{name} {length:4d} B  write {write['tags_per_minute']:7.1f}/min "
+                  f"p50 {write['p50_ms']:7.1f} ms p99 {write['p99_ms']:7.1f} ms {write['apdus_per_tag']:5.1f} APDUs  |  "
+                  f"read {read['tags_per_minute']:7.1f}/min p50 {read['p50_ms']:6.1f} ms {read['apdus_per_tag']:4.1f} APDUs")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Encode/decode throughput of the NDEF codec.
+
+    python bench_ndef.py --count 5000 --repeat 5
+
+Prints the best of --repeat runs for each direction over --count URLs of
+mixed lengths, including some long enough to need the 3-byte TLV length
+and long (non-SR) records.
+"""
+import argparse
+import random
+import time
+
+from ndef import encode_url, decode_tag_data
+
+
+def make_urls(count, seed=1252):
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyz0123456789-/"
+    urls = []
+    for i in range(count):
+        length = rng.choice((10, 40, 80, 200, 300, 800))
+        path = "".join(rng.choice(alphabet) for _ in range(length))
+        urls.append(f"https://homebox.local/item/{i}/{path}")
+    return urls
+
+
+def best_of(repeat, fn, items):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NDEF codec")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    urls = make_urls(args.count)
+    encoded = [encode_url(url) for url in urls]
+    for url, data in zip(urls, encoded):
+        if decode_tag_data(data) != url:
+            raise Exception(f"Round trip failed for {url}")
+    total_bytes = sum(len(data) for data in encoded)
+
+    for name, fn, items in (
+        ("encode", encode_url, urls),
+        ("decode", decode_tag_data, encoded),
+    ):
+        elapsed = best_of(args.repeat, fn, items)
+        print(f"{name}: {len(items) / elapsed:,.0f} URLs/s, "
+              f"{total_bytes / elapsed / 1e6:.1f} MB/s ({elapsed * 1000:.1f} ms for {len(items)} URLs)")
+
+
+if __name__ == "__main__":
+    main()
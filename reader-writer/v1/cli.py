@@ -0,0 +1,160 @@
+"""Headless batch writer, for packing benches that don't need the GUI.
+
+    python cli.py --urls urls.csv
+    python cli.py --template "https://homebox.local/item/{n}" --start 1 --count 2000
+
+Uses the same encode, write, verify and lock steps as the GUI but never
+imports PyQt6. For each URL it waits for a tag, writes it, streams one JSON
+line to stdout and waits for the tag to be removed. A tag that fails is
+reported and the same URL goes to the next tag, up to --attempts times.
+"""
+import argparse
+from functools import partial
+import json
+import sys
+import time
+
+from ndef import normalize_url, InvalidURL
+from jobs import iter_jobs
+from journal import Journal, batch_id, FINISHED, FINISHED_UNLOCKED
+from ntag import TagIO, ProfileCache, write_job
+from pcsc import wait_for_card
+
+
+def iter_urls(args):
+    if args.template:
+        n = args.start
+        while args.count is None or n < args.start + args.count:
+            yield args.template.format(n=n)
+            n += 1
+    elif args.urls == "-":
+        for line in sys.stdin:
+            url = line.strip()
+            if url and not url.startswith("#"):
+                yield url
+    else:
+        yield from iter_jobs(args.urls)
+
+
+def pick_reader(backend, wanted):
+    names = backend.list_readers()
+    if wanted:
+        if wanted not in names:
+            raise Exception(f"Reader not found: {wanted}")
+        return wanted
+    for name in names:
+        if "ACR1252" in name:  # Filter for ACR-1252 readers
+            return name
+    raise Exception("No ACR-1252 readers found")
+
+
+def emit(line):
+    sys.stdout.write(json.dumps(line) + "\n")
+    sys.stdout.flush()
+
+
+def journal_record(journal, batch, index, url, state, **fields):
+    journal.record(batch, index, state, url=url, **fields)
+
+
+def write_one(backend, reader_name, url, profiles, args, fast_read, record):
+    tag = TagIO(backend.connect(reader_name), fast_read)
+    try:
+        done = write_job(tag, profiles, url, not args.no_verify, not args.no_lock, record)
+    finally:
+        tag.connection.disconnect()
+    return tag, done.uid, done.write
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write and lock NFC URL tags without the GUI")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--urls", help="URL list, CSV or JSONL file, or - for stdin")
+    source.add_argument("--template", help="URL template, {n} is replaced by the tag number")
+    parser.add_argument("--start", type=int, default=1)
+    parser.add_argument("--count", type=int)
+    parser.add_argument("--reader", help="reader name (default: first ACR-1252)")
+    parser.add_argument("--no-verify", action="store_true")
+    parser.add_argument("--no-lock", action="store_true")
+    parser.add_argument("--attempts", type=int, default=3, help="tags to try per URL before skipping it")
+    parser.add_argument("--journal", help="SQLite journal (default: ~/.local/share/nfc-writer/journal.sqlite3, in memory with --simulate)")
+    parser.add_argument("--simulate", action="store_true", help="use a simulated reader that places and removes tags itself")
+    args = parser.parse_args()
+
+    if args.simulate:
+        from simulator import SimulatedBackend
+        backend = SimulatedBackend()
+    else:
+        from pcsc import PCSCBackend
+        backend = PCSCBackend()
+    reader_name = pick_reader(backend, args.reader)
+
+    # Job files resume from the journal; templates and stdin are journalled
+    # too but always start from the top
+    journal_path = args.journal or (":memory:" if args.simulate else None)
+    journal = Journal(journal_path, on_error=lambda message: print(message, file=sys.stderr))
+    resumable = args.urls and args.urls != "-"
+    batch = batch_id(args.urls) if resumable else (args.template or "stdin")
+    finished = journal.finished_jobs(batch, FINISHED_UNLOCKED if args.no_lock else FINISHED) if resumable else set()
+
+    profiles = ProfileCache()
+    fast_read = True
+    written = failed = skipped = 0
+    interrupted = False
+    try:
+        for index, url in enumerate(iter_urls(args)):
+            if index in finished:
+                continue
+            record = partial(journal_record, journal, batch, index, url)
+            try:
+                normalize_url(url)
+            except InvalidURL as e:
+                # Same rule as the GUI; no point waiting for a tag
+                skipped += 1
+                record("skipped", error=str(e))
+                emit({"index": index, "url": url, "status": "skipped", "error": str(e)})
+                continue
+            for attempt in range(args.attempts):
+                if args.simulate:
+                    backend.insert(reader_name=reader_name)
+                wait_for_card(backend, reader_name, True)
+                record("writing")
+                start = time.perf_counter()
+                line = {"index": index, "url": url}
+                try:
+                    tag, uid, result = write_one(backend, reader_name, url, profiles, args, fast_read, record)
+                    fast_read = tag.fast_read_supported
+                    line.update({
+                        "status": "written" if args.no_lock else "locked",
+                        "uid": uid.hex(),
+                        "tag": result.profile.name,
+                        "pages_written": len(result.plan.writes),
+                        "verify_retries": len(result.retried),
+                        "apdus": tag.apdus,
+                    })
+                except Exception as e:
+                    record("failed", error=str(e))
+                    line.update({"status": "failed", "error": str(e)})
+                line["ms"] = round((time.perf_counter() - start) * 1000, 1)
+                emit(line)
+                if args.simulate:
+                    backend.remove(reader_name)
+                wait_for_card(backend, reader_name, False)
+                if line["status"] != "failed":
+                    written += 1
+                    break
+                failed += 1
+            else:
+                skipped += 1
+                record("skipped")
+                emit({"index": index, "url": url, "status": "skipped"})
+    except KeyboardInterrupt:
+        interrupted = True  # Everything journalled so far is kept; rerun to resume
+    finally:
+        journal.close()
+    emit({"status": "interrupted" if interrupted else "done",
+          "written": written, "failed": failed, "skipped": skipped, "resumed": len(finished)})
+
+
+if __name__ == "__main__":
+    main()
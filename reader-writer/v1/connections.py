@@ -0,0 +1,50 @@
+"""Persistent per-reader connections.
+
+A connection is opened the first time a reader is used and then reused for
+as long as the tag stays on the reader. It is only dropped when the card
+monitor reports an insertion or removal, or when a transmit fails.
+"""
+import threading
+
+
+class ConnectionManager:
+    def __init__(self, backend):
+        self.backend = backend
+        self.connections = {}
+        self.lock = threading.Lock()
+        # Churn counters, so long sessions can be checked for reconnect storms
+        self.connects = 0
+        self.disconnects = 0
+        self.reuses = 0
+
+    def get(self, reader_name):
+        with self.lock:
+            connection = self.connections.get(reader_name)
+            if connection is not None:
+                self.reuses += 1
+                return connection
+        connection = self.backend.connect(reader_name)
+        with self.lock:
+            self.connections[reader_name] = connection
+            self.connects += 1
+        return connection
+
+    def invalidate(self, reader_name):
+        with self.lock:
+            connection = self.connections.pop(reader_name, None)
+        if connection is None:
+            return
+        try:
+            connection.disconnect()
+        except Exception:
+            pass  # The card is usually already gone
+        with self.lock:
+            self.disconnects += 1
+
+    def close_all(self):
+        for reader_name in list(self.connections):
+            self.invalidate(reader_name)
+
+    def churn(self):
+        with self.lock:
+            return {"connects": self.connects, "disconnects": self.disconnects, "reuses": self.reuses}
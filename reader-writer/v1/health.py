@@ -0,0 +1,86 @@
+"""Per-reader health scores for the write station.
+
+Each finished tag updates exponentially weighted moving averages of the
+reader's time per APDU, its failure rate and how many pages verify had to
+rewrite. Lower scores are healthier. A reader whose failure rate crosses the
+threshold is quarantined for a while and gets no jobs; when it comes back its
+averages start over, so one good tag doesn't hide a bad cable.
+"""
+import threading
+import time
+
+
+class ReaderHealth:
+    __slots__ = ("samples", "latency", "error_rate", "retries", "quarantined_until")
+
+    def __init__(self):
+        self.samples = 0
+        self.latency = None  # Seconds per APDU, successful tags only
+        self.error_rate = 0.0
+        self.retries = 0.0
+        self.quarantined_until = 0.0
+
+
+class HealthMonitor:
+    def __init__(self, alpha=0.2, error_threshold=0.5, min_samples=5, quarantine_seconds=300):
+        self.alpha = alpha
+        self.error_threshold = error_threshold
+        self.min_samples = min_samples  # Never judge a reader on its first few tags
+        self.quarantine_seconds = quarantine_seconds
+        self.readers = {}
+        self.lock = threading.Lock()
+
+    def _ewma(self, average, value):
+        return value if average is None else average + self.alpha * (value - average)
+
+    def record(self, reader_name, ok, seconds=None, apdus=None, retries=0):
+        """Returns True when this result puts the reader into quarantine."""
+        with self.lock:
+            health = self.readers.setdefault(reader_name, ReaderHealth())
+            health.samples += 1
+            health.error_rate = self._ewma(health.error_rate, 0.0 if ok else 1.0)
+            if ok:
+                if seconds is not None and apdus:
+                    health.latency = self._ewma(health.latency, seconds / apdus)
+                health.retries = self._ewma(health.retries, retries)
+            if (health.samples >= self.min_samples and health.error_rate > self.error_threshold
+                    and health.quarantined_until <= time.monotonic()):
+                health.quarantined_until = time.monotonic() + self.quarantine_seconds
+                return True
+            return False
+
+    def is_quarantined(self, reader_name):
+        with self.lock:
+            health = self.readers.get(reader_name)
+            if health is None or not health.quarantined_until:
+                return False
+            if health.quarantined_until > time.monotonic():
+                return True
+            # Back on probation with a clean slate
+            self.readers[reader_name] = ReaderHealth()
+            return False
+
+    def score(self, reader_name):
+        with self.lock:
+            health = self.readers.get(reader_name)
+            if health is None or health.latency is None:
+                return 0.0  # Untried readers go first so they get measured
+            return health.latency * (1 + health.retries) / max(0.05, 1 - health.error_rate)
+
+    def rank(self, reader_names):
+        """reader_names without quarantined ones, healthiest first."""
+        return sorted((name for name in reader_names if not self.is_quarantined(name)), key=self.score)
+
+    def snapshot(self):
+        with self.lock:
+            now = time.monotonic()
+            return {
+                name: {
+                    "samples": health.samples,
+                    "ms_per_apdu": None if health.latency is None else round(health.latency * 1000, 2),
+                    "error_rate": round(health.error_rate, 3),
+                    "retries": round(health.retries, 2),
+                    "quarantined": health.quarantined_until > now,
+                }
+                for name, health in self.readers.items()
+            }
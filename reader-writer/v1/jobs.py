@@ -0,0 +1,187 @@
+"""Batch job queue fed lazily from a URL list, CSV or JSONL file.
+
+Rows are read one at a time as tags are written, so a 100k-row file never
+sits in memory. Only failed jobs waiting for a retry and skipped jobs are
+kept. The queue is thread-safe so several reader workers can share it.
+A job that fails on max_attempts tags is skipped instead of retried, so one
+bad row (a URL too long for the tags, say) can't hold up the batch; a tag
+that refuses every job (already locked, say) is release()d instead, which
+costs the job no attempt.
+"""
+from collections import deque
+import csv
+import json
+import os
+import threading
+
+
+def iter_jobs(path):
+    """Yield URLs from path.
+
+    .csv files use the "url" column if there is a header with one, else the
+    first column; .jsonl files use each object's "url"; anything else is one
+    URL per line. Blank lines and lines starting with # are ignored.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="") as f:
+        if extension == ".csv":
+            rows = csv.reader(f)
+            column = 0
+            for row in rows:
+                if not row or row[0].startswith("#"):
+                    continue
+                names = [cell.strip().lower() for cell in row]
+                if "url" in names:
+                    column = names.index("url")
+                    continue
+                # Rows too short for the url column, or with it empty, are blank
+                if column < len(row) and row[column].strip():
+                    yield row[column].strip()
+        elif extension in (".jsonl", ".ndjson"):
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield json.loads(line)["url"]
+        else:
+            for line in f:
+                url = line.strip()
+                if url and not url.startswith("#"):
+                    yield url
+
+
+def count_jobs(path):
+    # Streams the file once; cheap enough to show "n of total" progress
+    return sum(1 for _ in iter_jobs(path))
+
+
+class Job:
+    __slots__ = ("index", "url", "attempts", "status", "error")
+
+    def __init__(self, index, url):
+        self.index = index
+        self.url = url
+        self.attempts = 0
+        self.status = "pending"
+        self.error = None
+
+
+class JobQueue:
+    def __init__(self, urls, total=None, finished=None, max_attempts=3):
+        self.urls = iter(urls)
+        self.total = total
+        self.finished = finished or set()  # Row indices already done in an earlier run
+        self.max_attempts = max_attempts  # None retries forever
+        self.lock = threading.Lock()
+        self.next_index = 0
+        self.retry = deque()  # Failed jobs go back in front of fresh rows
+        self.lookahead = None
+        self.skipped = []
+        self.in_flight = 0
+        self.written = 0
+        self.resumed = 0
+        self.failed = 0
+        self.exhausted = False
+
+    @classmethod
+    def from_file(cls, path, finished=None, max_attempts=3):
+        return cls(iter_jobs(path), count_jobs(path), finished, max_attempts)
+
+    def _pull(self):
+        while self.lookahead is None and not self.exhausted:
+            try:
+                url = next(self.urls)
+            except StopIteration:
+                self.exhausted = True
+                break
+            index = self.next_index
+            self.next_index += 1
+            if index in self.finished:
+                self.resumed += 1
+                continue
+            self.lookahead = Job(index, url)
+
+    def peek(self):
+        with self.lock:
+            if self.retry:
+                return self.retry[0]
+            self._pull()
+            return self.lookahead
+
+    def take(self):
+        with self.lock:
+            if self.retry:
+                job = self.retry.popleft()
+            else:
+                self._pull()
+                job, self.lookahead = self.lookahead, None
+            if job is not None:
+                job.status = "writing"
+                job.attempts += 1
+                self.in_flight += 1
+            return job
+
+    def complete(self, job):
+        with self.lock:
+            job.status = "written"
+            self.in_flight -= 1
+            self.written += 1
+
+    def fail(self, job, error=None):
+        """Back to the front of the queue so the next tag retries it.
+
+        Returns True if the job used up its attempts and was skipped instead.
+        """
+        with self.lock:
+            job.error = error
+            self.in_flight -= 1
+            self.failed += 1
+            if self.max_attempts is not None and job.attempts >= self.max_attempts:
+                job.status = "skipped"
+                self.skipped.append(job)
+                return True
+            job.status = "pending"
+            self.retry.appendleft(job)
+            return False
+
+    def release(self, job, error=None):
+        """Back to the front without using up an attempt: the tag was at fault, not the job."""
+        with self.lock:
+            job.status = "pending"
+            job.error = error
+            job.attempts -= 1
+            self.in_flight -= 1
+            self.failed += 1
+            self.retry.appendleft(job)
+
+    def skip(self, job):
+        with self.lock:
+            job.status = "skipped"
+            if job in self.retry:
+                self.retry.remove(job)
+            elif job is self.lookahead:
+                self.lookahead = None
+            else:
+                self.in_flight -= 1
+            self.skipped.append(job)
+
+    def requeue_skipped(self):
+        with self.lock:
+            for job in reversed(self.skipped):
+                job.status = "pending"
+                job.attempts = 0
+                self.retry.appendleft(job)
+            count = len(self.skipped)
+            self.skipped = []
+            return count
+
+    def done(self):
+        return self.peek() is None and not self.in_flight
+
+    def progress(self):
+        with self.lock:
+            return {
+                "written": self.written + self.resumed,
+                "failed": self.failed,
+                "skipped": len(self.skipped),
+                "total": self.total,
+            }
@@ -0,0 +1,184 @@
+"""Crash-safe batch journal in SQLite.
+
+Every job transition (pending, writing, written, verified, locked, failed)
+is appended with the tag UID, URL and page-image hash. The database runs in
+WAL mode and is written by a background thread that commits in batches, so
+recording a transition never blocks the tag write path. After a crash the
+journal tells which rows of a job file are finished, and a batch resumes
+from the first row that isn't.
+"""
+import hashlib
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+STATES = ("pending", "writing", "written", "verified", "locked", "failed", "skipped")
+FINISHED = ("locked",)
+FINISHED_UNLOCKED = ("written", "verified", "locked")  # Batches run without locking
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    batch TEXT NOT NULL,
+    job INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    url TEXT,
+    uid TEXT,
+    image_hash TEXT,
+    error TEXT,
+    at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    batch TEXT NOT NULL,
+    job INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    url TEXT,
+    uid TEXT,
+    image_hash TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (batch, job)
+);
+CREATE INDEX IF NOT EXISTS jobs_uid ON jobs (uid);
+"""
+
+
+def default_path():
+    return os.path.join(os.path.expanduser("~"), ".local", "share", "nfc-writer", "journal.sqlite3")
+
+
+def batch_id(path):
+    """Absolute path plus a hash of the contents.
+
+    Reloading the same file resumes it; a different export saved under the
+    same name is a new batch, so its rows aren't skipped as already written.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return f"{os.path.abspath(path)}#{digest.hexdigest()[:16]}"
+
+
+class Journal:
+    def __init__(self, path=None, flush_interval=0.2, batch_size=256, on_error=None):
+        self.path = path or default_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.on_error = on_error  # on_error(message) from the writer thread
+        self.last_error = None
+        self.pending = queue.Queue()
+        self.flushed = threading.Condition()
+        self.counter = itertools.count(1)
+        self.sequence = 0
+        self.flushed_sequence = 0
+        self.db_lock = threading.Lock()  # Writer thread and queries share one connection
+        self.db = self._open()
+        self.thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self.thread.start()
+
+    def _open(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")  # Durable across app crashes in WAL mode
+        db.executescript(SCHEMA)
+        db.commit()
+        return db
+
+    def record(self, batch, job, state, url=None, uid=None, image_hash=None, error=None):
+        """Queue a transition; returns immediately."""
+        if state not in STATES:
+            raise Exception(f"Unknown job state: {state}")
+        if isinstance(uid, (bytes, bytearray)):
+            uid = uid.hex()
+        self.sequence = next(self.counter)
+        self.pending.put((batch, job, state, url, uid, image_hash, error, time.time()))
+
+    def flush(self, timeout=5):
+        # Wait until everything recorded so far is committed
+        target = self.sequence
+        with self.flushed:
+            self.flushed.wait_for(lambda: self.flushed_sequence >= target, timeout)
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join(timeout=5)
+        with self.db_lock:
+            self.db.close()
+
+    def _run(self):
+        rows = []  # Kept across a failed commit and retried on the next pass
+        stop = False
+        while not stop:
+            try:
+                item = self.pending.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if not rows:
+                    continue
+            else:
+                # Coalesce whatever else is already queued into the same commit
+                while item is not None:
+                    rows.append(item)
+                    if len(rows) >= self.batch_size:
+                        break
+                    try:
+                        item = self.pending.get_nowait()
+                    except queue.Empty:
+                        break
+                stop = item is None
+            try:
+                self._commit(rows)
+            except sqlite3.Error as e:
+                # Another process holding the database, say; never let the
+                # writer thread die and silently drop everything after.
+                # Reported once, not every pass while it keeps failing
+                if stop and self.on_error:
+                    self.on_error(f"Journal closed with {len(rows)} row(s) not saved: {e}")
+                elif str(e) != self.last_error and self.on_error:
+                    self.on_error(f"Journal commit failed, keeping {len(rows)} row(s) to retry: {e}")
+                self.last_error = str(e)
+                continue
+            rows = []
+            self.last_error = None
+
+    def _commit(self, rows):
+        if rows:
+            with self.db_lock, self.db:
+                self.db.executemany(
+                    "INSERT INTO events (batch, job, state, url, uid, image_hash, error, at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                self.db.executemany(
+                    "INSERT INTO jobs (batch, job, state, url, uid, image_hash, updated) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (batch, job) DO UPDATE SET state = excluded.state, "
+                    "url = COALESCE(excluded.url, jobs.url), uid = COALESCE(excluded.uid, jobs.uid), "
+                    "image_hash = COALESCE(excluded.image_hash, jobs.image_hash), updated = excluded.updated",
+                    [(batch, job, state, url, uid, image_hash, at) for batch, job, state, url, uid, image_hash, error, at in rows]
+                )
+        with self.flushed:
+            self.flushed_sequence += len(rows)
+            self.flushed.notify_all()
+
+    # Queries run on the caller's thread against the committed data
+
+    def _query(self, sql, params=()):
+        with self.db_lock:
+            return self.db.execute(sql, params).fetchall()
+
+    def finished_jobs(self, batch, states=FINISHED):
+        rows = self._query(
+            f"SELECT job FROM jobs WHERE batch = ? AND state IN ({', '.join('?' for _ in states)})",
+            (batch,) + tuple(states),
+        )
+        return set(row[0] for row in rows)
+
+    def locked_tags(self, since=0.0):
+        """(uid, url, updated) for every tag locked after since, oldest first."""
+        return self._query(
+            "SELECT uid, url, updated FROM jobs WHERE state = 'locked' AND uid IS NOT NULL AND updated > ? "
+            "ORDER BY updated", (since,)
+        )
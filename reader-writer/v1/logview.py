@@ -0,0 +1,120 @@
+"""Bounded status log for the write and read tabs.
+
+LogModel keeps the newest lines in a ring buffer, so memory stays flat over
+a long shift, and LogView shows them in a QListView that only lays out the
+visible rows. Appends are queued and handed to the view in one batch per
+frame, however many arrive in between.
+
+Events carry a message with a {} per value and the raw values next to it:
+bytes are shown as hex, anything else with str(). Nothing is formatted until
+a row is drawn or copied, and lines below the model's level are dropped
+before that.
+"""
+from collections import deque
+
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QListView, QAbstractItemView
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_COLORS = {DEBUG: QColor("gray"), WARNING: QColor("darkorange"), ERROR: QColor("red")}
+FRAME_MS = 16
+
+
+def hex_bytes(data):
+    return bytes(data).hex(" ").upper()
+
+
+def format_value(value):
+    if isinstance(value, (bytes, bytearray, memoryview, list)):
+        return hex_bytes(value)
+    return str(value)
+
+
+def format_event(message, data):
+    return message.format(*(format_value(value) for value in data)) if data else message
+
+
+class LogModel(QAbstractListModel):
+    def __init__(self, capacity=5000, level=INFO, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self.level = level  # Lines below this level are dropped on append
+        self.lines = deque()
+        self.pending = []
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(FRAME_MS)
+        self.flush_timer.timeout.connect(self.flush)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.lines)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        level, message, data = self.lines[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return format_event(message, data)
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return LEVEL_COLORS.get(level)
+        return None
+
+    def append(self, level, message, data=()):
+        if level < self.level:
+            return
+        self.pending.append((level, message, data))
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        if not self.pending:
+            return
+        # Only the newest capacity lines can survive this batch
+        pending, self.pending = self.pending[-self.capacity:], []
+        overflow = len(self.lines) + len(pending) - self.capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self.lines.popleft()
+            self.endRemoveRows()
+        first = len(self.lines)
+        self.beginInsertRows(QModelIndex(), first, first + len(pending) - 1)
+        self.lines.extend(pending)
+        self.endInsertRows()
+
+    def clear(self):
+        self.flush_timer.stop()
+        self.pending = []
+        self.beginResetModel()
+        self.lines.clear()
+        self.endResetModel()
+
+
+class LogView(QListView):
+    def __init__(self, capacity=5000, parent=None):
+        super().__init__(parent)
+        self.setModel(LogModel(capacity, parent=self))
+        # Every row is one line, so the view never measures rows it can't see
+        self.setUniformItemSizes(True)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.follow = True
+        self.verticalScrollBar().valueChanged.connect(self.on_scrolled)
+        # The range grows once the new rows are laid out, so follow that
+        self.verticalScrollBar().rangeChanged.connect(self.on_range_changed)
+
+    def on_scrolled(self, value):
+        # Stop following new lines while the operator scrolls back
+        self.follow = value >= self.verticalScrollBar().maximum()
+
+    def on_range_changed(self, minimum, maximum):
+        if self.follow:
+            self.verticalScrollBar().setValue(maximum)
+
+    def log(self, level, message, data=()):
+        self.model().append(level, message, data)
+
+    def clear(self):
+        self.model().clear()
+        self.follow = True
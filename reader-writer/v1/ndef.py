@@ -0,0 +1,307 @@
+"""NDEF codec shared by the reader and the writer.
+
+Qt-free and pyscard-free. Encoding sizes the whole tag image first and fills
+one preallocated bytearray; decoding walks a memoryview once and hands back
+record fields as memoryview slices, so neither direction builds intermediate
+lists or copies.
+"""
+from collections import namedtuple
+
+# TLV block tags (NFC Forum Type 2 Tag)
+TLV_NULL = 0x00
+TLV_LOCK_CONTROL = 0x01
+TLV_MEMORY_CONTROL = 0x02
+TLV_NDEF = 0x03
+TLV_PROPRIETARY = 0xFD
+TLV_TERMINATOR = 0xFE
+
+# Record header flags
+MB = 0x80
+ME = 0x40
+CF = 0x20
+SR = 0x10
+IL = 0x08
+TNF_MASK = 0x07
+TNF_WELL_KNOWN = 0x01
+
+URI_TYPE = b"U"
+
+# NFC Forum URI Record Type Definition, identifier codes 0x00-0x23
+URI_PREFIXES = (
+    "",                            # 0x00 no prefix
+    "http://www.",                 # 0x01
+    "https://www.",                # 0x02
+    "http://",                     # 0x03
+    "https://",                    # 0x04
+    "tel:",                        # 0x05
+    "mailto:",                     # 0x06
+    "ftp://anonymous:anonymous@",  # 0x07
+    "ftp://ftp.",                  # 0x08
+    "ftps://",                     # 0x09
+    "sftp://",                     # 0x0A
+    "smb://",                      # 0x0B
+    "nfs://",                      # 0x0C
+    "ftp://",                      # 0x0D
+    "dav://",                      # 0x0E
+    "news:",                       # 0x0F
+    "telnet://",                   # 0x10
+    "imap:",                       # 0x11
+    "rtsp://",                     # 0x12
+    "urn:",                        # 0x13
+    "pop:",                        # 0x14
+    "sip:",                        # 0x15
+    "sips:",                       # 0x16
+    "tftp:",                       # 0x17
+    "btspp://",                    # 0x18
+    "btl2cap://",                  # 0x19
+    "btgoep://",                   # 0x1A
+    "tcpobex://",                  # 0x1B
+    "irdaobex://",                 # 0x1C
+    "file://",                     # 0x1D
+    "urn:epc:id:",                 # 0x1E
+    "urn:epc:tag:",                # 0x1F
+    "urn:epc:pat:",                # 0x20
+    "urn:epc:raw:",                # 0x21
+    "urn:epc:",                    # 0x22
+    "urn:nfc:",                    # 0x23
+)
+
+# Longest first, so e.g. "https://www." wins over "https://"
+_PREFIXES_BY_LENGTH = sorted(
+    ((prefix, code) for code, prefix in enumerate(URI_PREFIXES) if prefix),
+    key=lambda item: len(item[0]), reverse=True,
+)
+
+# Our writer puts one 0x01 byte in front of the NDEF TLV; kept so tags stay
+# readable by the older app versions
+LEGACY_HEADER = 0x01
+
+Record = namedtuple("Record", "tnf type id payload")
+
+
+def best_uri_prefix(url):
+    """Identifier code of the longest URI prefix that url starts with."""
+    for prefix, code in _PREFIXES_BY_LENGTH:
+        if url.startswith(prefix):
+            return code
+    return 0x00
+
+
+def uri_record(url, prefix_code=None):
+    # Every byte the prefix code absorbs is one less byte written to the tag
+    if prefix_code is None:
+        prefix_code = best_uri_prefix(url)
+    prefix = URI_PREFIXES[prefix_code]
+    body = (url[len(prefix):] if prefix and url.startswith(prefix) else url).encode()
+    payload = bytearray(1 + len(body))
+    payload[0] = prefix_code
+    payload[1:] = body
+    return Record(TNF_WELL_KNOWN, URI_TYPE, b"", payload)
+
+
+def record_size(record):
+    payload_length = len(record.payload)
+    size = 2 + (1 if payload_length < 256 else 4)
+    if record.id:
+        size += 1 + len(record.id)
+    return size + len(record.type) + payload_length
+
+
+def message_size(records):
+    return sum(record_size(record) for record in records)
+
+
+def tlv_header_size(length):
+    return 2 if length < 0xFF else 4
+
+
+def _write_record(buf, offset, record, first, last):
+    payload_length = len(record.payload)
+    short = payload_length < 256
+    header = record.tnf & TNF_MASK
+    if first:
+        header |= MB
+    if last:
+        header |= ME
+    if short:
+        header |= SR
+    if record.id:
+        header |= IL
+    buf[offset] = header
+    buf[offset + 1] = len(record.type)
+    offset += 2
+    if short:
+        buf[offset] = payload_length
+        offset += 1
+    else:
+        buf[offset:offset + 4] = payload_length.to_bytes(4, "big")
+        offset += 4
+    if record.id:
+        buf[offset] = len(record.id)
+        offset += 1
+    for field in (record.type, record.id, record.payload):
+        buf[offset:offset + len(field)] = field
+        offset += len(field)
+    return offset
+
+
+def encode_message_into(buf, offset, records):
+    last = len(records) - 1
+    for index, record in enumerate(records):
+        offset = _write_record(buf, offset, record, index == 0, index == last)
+    return offset
+
+
+def encode_message(records):
+    buf = bytearray(message_size(records))
+    encode_message_into(buf, 0, records)
+    return bytes(buf)
+
+
+def encode_tag_data(records, legacy_header=True):
+    """Bytes to write from page 4 on: header, NDEF TLV and terminator."""
+    length = message_size(records)
+    buf = bytearray((1 if legacy_header else 0) + tlv_header_size(length) + length + 1)
+    offset = 0
+    if legacy_header:
+        buf[0] = LEGACY_HEADER
+        offset = 1
+    buf[offset] = TLV_NDEF
+    if length < 0xFF:
+        buf[offset + 1] = length
+        offset += 2
+    else:
+        buf[offset + 1] = 0xFF
+        buf[offset + 2] = (length >> 8) & 0xFF
+        buf[offset + 3] = length & 0xFF
+        offset += 4
+    offset = encode_message_into(buf, offset, records)
+    buf[offset] = TLV_TERMINATOR
+    return bytes(buf)
+
+
+def encode_url(url, prefix_code=None, legacy_header=True):
+    return encode_tag_data([uri_record(url, prefix_code)], legacy_header)
+
+
+class InvalidURL(Exception):
+    pass
+
+
+def normalize_url(url):
+    """url as it goes on a tag: lowercased, and only complete http(s) URLs."""
+    if url.lower() in ("http://", "https://"):
+        raise InvalidURL("Please enter a complete URL after http:// or https://")
+    if not url.startswith(("http://", "https://")):
+        raise InvalidURL("URL must start with http:// or https://")
+    return url.lower()
+
+
+def encode_tag_url(url):
+    """Validate, lowercase and encode url; every write path goes through here."""
+    return encode_url(normalize_url(url))
+
+
+def find_ndef_tlv(area):
+    """Locate the NDEF message TLV in the bytes that start at page 4.
+
+    Returns (value_offset, value_length), or None if the area holds no NDEF
+    message. Understands both the 1-byte length and the 3-byte 0xFF form.
+    """
+    # Tags from our own writer start with a single 0x01 header byte directly
+    # followed by the NDEF TLV. It looks like a Lock Control TLV of length 3,
+    # so tell them apart by the NDEF record header (MB set) after the length.
+    offset = 0
+    if area[0] == TLV_LOCK_CONTROL and area[1] == TLV_NDEF:
+        header = area[5] if area[2] == 0xFF else area[3]
+        if header & MB and header & TNF_MASK in (0x01, 0x02, 0x03, 0x04):
+            offset = 1
+    while offset < len(area):
+        tag = area[offset]
+        if tag == TLV_NULL:
+            offset += 1
+            continue
+        if tag == TLV_TERMINATOR:
+            return None
+        if offset + 1 >= len(area):
+            break
+        if area[offset + 1] == 0xFF:
+            if offset + 3 >= len(area):
+                break
+            length = (area[offset + 2] << 8) | area[offset + 3]
+            value_offset = offset + 4
+        else:
+            length = area[offset + 1]
+            value_offset = offset + 2
+        if tag == TLV_NDEF:
+            return value_offset, length
+        offset = value_offset + length  # Skip Lock/Memory Control and proprietary TLVs
+    raise Exception("TLV header runs past the bytes read")
+
+
+def decode_message(data):
+    """Split an NDEF message into Records in one pass.
+
+    Fields are memoryview slices of data, so nothing is copied until the
+    caller asks for it.
+    """
+    view = memoryview(data)
+    records = []
+    offset = 0
+    end = len(view)
+    while offset < end:
+        header = view[offset]
+        if header & CF:
+            raise Exception("Chunked NDEF records are not supported")
+        type_length = view[offset + 1]
+        offset += 2
+        if header & SR:
+            payload_length = view[offset]
+            offset += 1
+        else:
+            payload_length = int.from_bytes(view[offset:offset + 4], "big")
+            offset += 4
+        id_length = 0
+        if header & IL:
+            id_length = view[offset]
+            offset += 1
+        record_type = view[offset:offset + type_length]
+        offset += type_length
+        record_id = view[offset:offset + id_length]
+        offset += id_length
+        payload = view[offset:offset + payload_length]
+        offset += payload_length
+        if offset > end:
+            raise Exception("NDEF record runs past the end of the message")
+        records.append(Record(header & TNF_MASK, record_type, record_id, payload))
+        if header & ME:
+            break
+    return records
+
+
+def decode_uri(payload):
+    prefix_code = payload[0]
+    if prefix_code >= len(URI_PREFIXES):
+        raise Exception(f"Unsupported URL prefix code: {hex(prefix_code)}")
+    return URI_PREFIXES[prefix_code] + bytes(payload[1:]).decode("utf-8")
+
+
+def is_uri_record(record):
+    return record.tnf == TNF_WELL_KNOWN and record.type == URI_TYPE
+
+
+def decode_url(message):
+    """First URI in an NDEF message, or None."""
+    for record in decode_message(message):
+        if is_uri_record(record):
+            return decode_uri(record.payload)
+    return None
+
+
+def decode_tag_data(area):
+    """URL stored in the bytes read from page 4 on, or None."""
+    found = find_ndef_tlv(area)
+    if found is None:
+        return None
+    value_offset, length = found
+    return decode_url(memoryview(area)[value_offset:value_offset + length])
@@ -0,0 +1,425 @@
+"""NTAG21x page access over an ACR-1252 connection.
+
+Wraps a PC/SC connection with page-level READ/WRITE helpers and a bulk read
+that fetches many pages per exchange: NTAG21x FAST_READ (0x3A) sent through
+the reader's direct-transmit pseudo-APDU, falling back to 16-byte READ
+BINARY responses (4 pages each) on readers that reject it.
+"""
+from collections import OrderedDict, namedtuple
+import hashlib
+from ndef import find_ndef_tlv, encode_tag_url, normalize_url
+
+GET_VERSION = 0x60
+FAST_READ = 0x3A
+MAX_FAST_READ_PAGES = 63  # 252 bytes, keeps the response inside a short APDU
+READ_BINARY_PAGES = 4     # READ BINARY with Le=16 returns four pages
+FIRST_USER_PAGE = 4
+# Status words a reader answers with when it doesn't pass direct transmit
+# through at all, as opposed to the tag NAKing or the RF link failing
+NOT_SUPPORTED = ((0x6A, 0x81), (0x6D, 0x00), (0x6E, 0x00))
+
+# storage_size is byte 6 of the GET_VERSION response, cc_size byte 2 of the CC.
+# user_end is the last user memory page; the dynamic lock bytes follow it.
+TagProfile = namedtuple(
+    "TagProfile", "name storage_size cc_size total_pages user_end dynamic_lock_page"
+)
+NTAG213 = TagProfile("NTAG213", 0x0F, 0x12, 45, 39, 40)
+NTAG215 = TagProfile("NTAG215", 0x11, 0x3E, 135, 129, 130)
+NTAG216 = TagProfile("NTAG216", 0x13, 0x6D, 231, 225, 226)
+PROFILES = (NTAG213, NTAG215, NTAG216)
+
+
+def user_capacity(profile):
+    return (profile.user_end - FIRST_USER_PAGE + 1) * 4
+
+
+def cc_bytes(profile):
+    return [0xE1, 0x10, profile.cc_size, 0x00]
+
+
+class UnsupportedCommand(Exception):
+    pass
+
+
+class TagError(Exception):
+    """The tag itself can't take this write; another reader won't do better."""
+
+
+class JobError(TagError):
+    """The job can't go on this tag at all (its URL is too long for it)."""
+
+
+# Who a failed write is down to, see fault_of
+READER_FAULT, TAG_FAULT, JOB_FAULT = "reader", "tag", "job"
+
+
+def fault_of(error):
+    """Only reader faults count against health; only job faults use up a job's attempts."""
+    if isinstance(error, JobError):
+        return JOB_FAULT
+    if isinstance(error, TagError):
+        return TAG_FAULT
+    return READER_FAULT
+
+
+class TagIO:
+    def __init__(self, connection, fast_read=True, trace=None):
+        self.connection = connection
+        self.fast_read_supported = fast_read
+        self.trace = trace  # trace(apdu, response, sw1, sw2) for debug dumps
+        self.apdus = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def transmit(self, apdu):
+        response, sw1, sw2 = self.connection.transmit(apdu)
+        self.apdus += 1
+        self.bytes_sent += len(apdu)
+        self.bytes_received += len(response) + 2
+        if self.trace:
+            self.trace(apdu, response, sw1, sw2)
+        return response, sw1, sw2
+
+    def direct(self, command):
+        # Native tag command wrapped in the reader's direct-transmit pseudo-APDU
+        response, sw1, sw2 = self.transmit([0xFF, 0x00, 0x00, 0x00, len(command)] + list(command))
+        if (sw1, sw2) in NOT_SUPPORTED:
+            raise UnsupportedCommand(f"Direct transmit not supported: {hex(sw1)} {hex(sw2)}")
+        if not (sw1 == 0x90 and sw2 == 0x00):
+            raise Exception(f"Direct transmit failed: {hex(sw1)} {hex(sw2)}")
+        if response[:2] == [0xD5, 0x43]:  # PN53x-style InCommunicateThru framing
+            if response[2] != 0x00:
+                raise Exception(f"Direct transmit failed: status {hex(response[2])}")
+            response = response[3:]
+        return response
+
+    def get_uid(self):
+        response, sw1, sw2 = self.transmit([0xFF, 0xCA, 0x00, 0x00, 0x00])
+        if not (sw1 == 0x90 and sw2 == 0x00):
+            raise Exception(f"Get UID failed: {hex(sw1)} {hex(sw2)}")
+        return bytes(response)
+
+    def get_version(self):
+        response = self.direct([GET_VERSION])
+        if len(response) != 8:
+            raise Exception(f"GET_VERSION returned {len(response)} bytes")
+        return bytes(response)
+
+    def read_binary(self, page, length=4):
+        apdu = [0xFF, 0xB0, 0x00, page, length]
+        response, sw1, sw2 = self.transmit(apdu)
+        if not (sw1 == 0x90 and sw2 == 0x00):
+            raise Exception(f"Read failed at page {page}: {hex(sw1)} {hex(sw2)}")
+        return response
+
+    def write_page(self, page, data):
+        data = list(data)
+        while len(data) < 4:
+            data.append(0x00)
+        apdu = [0xFF, 0xD6, 0x00, page] + [len(data)] + data
+        response, sw1, sw2 = self.transmit(apdu)
+        if not (sw1 == 0x90 and sw2 == 0x00):
+            raise Exception(f"Write failed at page {page}: {hex(sw1)} {hex(sw2)}")
+
+    def fast_read(self, first, last):
+        expected = (last - first + 1) * 4
+        response = self.direct([FAST_READ, first, last])
+        if len(response) != expected:
+            raise Exception(f"FAST_READ {first}-{last} returned {len(response)} bytes, expected {expected}")
+        return response
+
+    def read_pages(self, first, last):
+        """Read pages first..last inclusive in as few exchanges as possible."""
+        data = bytearray()
+        page = first
+        fast_read = self.fast_read_supported
+        while page <= last:
+            if fast_read:
+                end = min(last, page + MAX_FAST_READ_PAGES - 1)
+                try:
+                    data += bytes(self.fast_read(page, end))
+                    page = end + 1
+                    continue
+                except UnsupportedCommand:
+                    # Remember for the rest of this reader's life; don't retry per read
+                    self.fast_read_supported = False
+                    fast_read = False
+                except Exception:
+                    # A glitch or NAK: finish this read with READ BINARY but
+                    # keep using FAST_READ afterwards
+                    fast_read = False
+            response = self.read_binary(page, READ_BINARY_PAGES * 4)
+            wanted = min(READ_BINARY_PAGES, last - page + 1)
+            if len(response) < wanted * 4:
+                raise Exception(f"Short read at page {page}: {len(response)} bytes")
+            data += bytes(response[:wanted * 4])
+            page += wanted
+        return data
+
+
+def read_ndef_message(tag, last_page):
+    """Read the CC and exactly the pages holding the NDEF message.
+
+    One exchange fetches the CC plus the first three data pages, which is
+    enough to parse the TLV length; a second planned exchange fetches the
+    rest of the message, if any. Returns (cc, message) where message is None
+    for tags that are not NDEF formatted or hold no NDEF TLV.
+    """
+    head = tag.read_pages(3, 6)
+    cc = bytes(head[:4])
+    if cc[0] != 0xE1:
+        return cc, None
+
+    area = head[4:]
+    found = find_ndef_tlv(area)
+    if found is None:
+        return cc, None
+    value_offset, length = found
+
+    end = value_offset + length
+    end_page = 4 + (end - 1) // 4 if end else 4
+    if end_page > last_page:
+        raise Exception(f"NDEF length {length} runs past the end of the tag")
+    if end_page > 6:
+        area += tag.read_pages(7, end_page)
+    return cc, bytes(area[value_offset:end])
+
+
+def identify_tag(tag, cc=None):
+    """Work out the tag type from GET_VERSION, else from the CC size byte.
+
+    Older versions of this app wrote an NTAG216 CC to every tag, and the CC
+    is one-time-programmable, so GET_VERSION is trusted first. Anything that
+    is neither an NTAG213/215/216 nor carries one of their CCs (an Ultralight,
+    say) raises TagError rather than being written with the wrong layout.
+    """
+    storage_size = None
+    try:
+        storage_size = tag.get_version()[6]
+    except Exception:
+        pass
+    for profile in PROFILES:
+        if profile.storage_size == storage_size:
+            return profile
+    if storage_size is None:
+        if cc is None:
+            cc = tag.read_binary(3)
+        for profile in PROFILES:
+            if cc[0] == 0xE1 and cc[2] == profile.cc_size:
+                return profile
+    detail = f"storage size {hex(storage_size)}" if storage_size is not None else "no GET_VERSION, unknown CC"
+    raise TagError(f"Unsupported tag ({detail}); only NTAG213/215/216 are supported")
+
+
+class ProfileCache:
+    """Tag profiles by UID, so GET_VERSION runs once per physical tag."""
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.profiles = OrderedDict()
+
+    def lookup(self, tag, uid=None):
+        if uid is None:
+            uid = tag.get_uid()
+        profile = self.profiles.get(uid)
+        if profile is not None:
+            self.profiles.move_to_end(uid)
+            return profile
+        profile = identify_tag(tag)
+        self.profiles[uid] = profile
+        if len(self.profiles) > self.size:
+            self.profiles.popitem(last=False)
+        return profile
+
+
+class UIDCache:
+    """Small LRU of per-tag results keyed by UID, for the length of a session."""
+
+    def __init__(self, size=256):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, uid):
+        entry = self.entries.get(uid)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(uid)
+        return entry
+
+    def put(self, uid, entry):
+        self.entries[uid] = entry
+        self.entries.move_to_end(uid)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def discard(self, uid):
+        self.entries.pop(uid, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+def page_image(profile, ndef_data):
+    """Target page contents, CC included, as {page: 4 bytes}."""
+    image = {3: bytes(cc_bytes(profile))}
+    for i in range(0, len(ndef_data), 4):
+        image[FIRST_USER_PAGE + i // 4] = bytes(ndef_data[i:i + 4]).ljust(4, b"\x00")
+    return image
+
+
+def cc_is_formatted(cc):
+    # The CC is OTP, so any E1 10 xx 00 is left alone rather than rewritten
+    return cc[0] == 0xE1 and cc[1] == 0x10 and cc[3] == 0x00
+
+
+WritePlan = namedtuple("WritePlan", "image writes skipped read_apdus")
+
+
+def plan_write(tag, profile, ndef_data):
+    """Diff the tag's current pages against the target image.
+
+    One bulk read fetches the CC and every page the message will occupy;
+    only pages whose contents differ end up in plan.writes.
+    """
+    image = page_image(profile, ndef_data)
+    last_page = max(image)
+    apdus_before = tag.apdus
+    current = tag.read_pages(3, last_page)
+    writes = []
+    for page in sorted(image):
+        have = bytes(current[(page - 3) * 4:(page - 2) * 4])
+        if page == 3 and cc_is_formatted(have):
+            continue
+        if have != image[page]:
+            writes.append((page, image[page]))
+    return WritePlan(image, writes, len(image) - len(writes), tag.apdus - apdus_before)
+
+
+def apply_plan(tag, plan):
+    for page, data in plan.writes:
+        tag.write_page(page, data)
+    # APDUs saved against rewriting every page, after paying for the diff read
+    return plan.skipped - plan.read_apdus
+
+
+def image_digest(pages):
+    return hashlib.sha256(b"".join(pages)).hexdigest()
+
+
+def plan_digest(plan):
+    return image_digest([plan.image[page] for page in sorted(plan.image)])
+
+
+def verify_write(tag, plan, retries=1):
+    """Read the written range back in one bulk read and compare digests.
+
+    On a mismatch only the failing pages are rewritten before checking
+    again. Returns the list of pages that were retried; raises if the tag
+    still doesn't match after the retries.
+    """
+    first = min(plan.image)
+    last = max(plan.image)
+    expected = [plan.image[page] for page in range(first, last + 1)]
+    retried = []
+    for attempt in range(retries + 1):
+        current = tag.read_pages(first, last)
+        pages = [bytes(current[i:i + 4]) for i in range(0, len(current), 4)]
+        if first == 3 and cc_is_formatted(pages[0]):
+            expected[0] = pages[0]  # An existing CC was kept on purpose
+        if image_digest(pages) == image_digest(expected):
+            return retried
+        failing = [
+            page for page, have, want in zip(range(first, last + 1), pages, expected)
+            if have != want
+        ]
+        if attempt == retries:
+            raise Exception(f"Verify failed at page(s) {', '.join(str(page) for page in failing)}")
+        for page in failing:
+            tag.write_page(page, plan.image[page])
+        retried.extend(failing)
+    return retried
+
+
+def lock_tag(tag, profile):
+    """Set every static and dynamic lock bit; the tag is read-only afterwards."""
+    tag.write_page(2, [0xFF, 0xFF, 0xFF, 0xFF])
+    tag.write_page(profile.dynamic_lock_page, [0xFF, 0xFF, 0xFF, 0xFF])
+
+
+def is_locked(tag, profile):
+    """True if the lock bits lock_tag sets are all set, so the tag can't change."""
+    static = tag.read_pages(2, 2)
+    if static[2] != 0xFF or static[3] != 0xFF:
+        return False
+    dynamic = tag.read_pages(profile.dynamic_lock_page, profile.dynamic_lock_page)
+    return dynamic[0] == 0xFF and dynamic[1] == 0xFF
+
+
+def any_lock_bits(tag, profile):
+    """True if any static or dynamic lock bit is set, even a partial lock."""
+    static = tag.read_pages(2, 2)
+    dynamic = tag.read_pages(profile.dynamic_lock_page, profile.dynamic_lock_page)
+    return any(static[2:4]) or any(dynamic[0:3])
+
+
+WriteResult = namedtuple("WriteResult", "profile plan saved retried")
+
+
+def write_ndef(tag, profile, ndef_data, verify=True, on_state=None):
+    """Differential write plus the optional read-back check. Does not lock.
+
+    on_state(state, plan) is called with "written" and then "verified".
+    """
+    if len(ndef_data) > user_capacity(profile):
+        raise JobError(f"URL too long for {profile.name} capacity ({user_capacity(profile)} bytes)")
+    plan = plan_write(tag, profile, ndef_data)
+    try:
+        saved = apply_plan(tag, plan)
+    except Exception:
+        # Two extra reads, only on failure, to tell a locked tag from a bad reader
+        try:
+            locked = any_lock_bits(tag, profile)
+        except Exception:
+            locked = False
+        if locked:
+            raise TagError("Tag is locked and can't be rewritten")
+        raise
+    if on_state:
+        on_state("written", plan)
+    retried = []
+    if verify:
+        retried = verify_write(tag, plan)
+        if on_state:
+            on_state("verified", plan)
+    return WriteResult(profile, plan, saved, retried)
+
+
+JobResult = namedtuple("JobResult", "uid url profile write")
+
+
+def write_job(tag, profiles, url, verify=True, lock=True, record=None, uid=None):
+    """Encode, write, verify and lock url on the tag in hand.
+
+    The one sequence the GUI, both stations, the CLI and the bench run.
+    profiles is a ProfileCache; record(state, **fields) journals "written",
+    "verified" and "locked" as they happen. A lock failure raises, so a tag
+    is never reported finished unless it is locked. Returns a JobResult whose
+    url is the normalized URL now on the tag, ready for the locked-tag cache.
+    """
+    if uid is None:
+        uid = tag.get_uid()
+    url = normalize_url(url)
+    profile = profiles.lookup(tag, uid)
+    on_state = None
+    if record:
+        on_state = lambda state, plan: record(state, uid=uid, image_hash=plan_digest(plan))
+    result = write_ndef(tag, profile, encode_tag_url(url), verify, on_state)
+    if lock:
+        lock_tag(tag, profile)
+        if record:
+            record("locked", uid=uid)
+    return JobResult(uid, url, profile, result)
@@ -0,0 +1,211 @@
+"""PC/SC backend and event-driven card detection.
+
+The GUI never calls pyscard directly: it goes through a backend object so the
+same code can be driven by a real ACR-1252 or by a simulated reader.
+"""
+import threading
+
+# Pseudo-reader whose state changes whenever a reader is attached or removed
+PNP_NOTIFICATION = "\\\\?PnP?\\Notification"
+
+
+class PCSCBackend:
+    """pyscard backend.
+
+    Card presence is reported by SCardGetStatusChange, which blocks inside the
+    PC/SC daemon until something changes, so waiting for a tag costs no CPU.
+    """
+
+    def __init__(self):
+        from smartcard import scard
+        self.scard = scard
+        hresult, self.context = scard.SCardEstablishContext(scard.SCARD_SCOPE_USER)
+        if hresult != scard.SCARD_S_SUCCESS:
+            raise Exception(f"Could not establish PC/SC context: {scard.SCardGetErrorMessage(hresult)}")
+        self.reader_states = {}  # Last raw state per reader, fed back to SCardGetStatusChange
+        # Reader-list changes are waited for on a context of their own, so that
+        # wait can run alongside the card status wait
+        self.pnp_context = None
+        self.pnp_state = scard.SCARD_STATE_UNAWARE
+        # And enumeration gets a third: a call on self.context queues behind
+        # the CardMonitor's SCardGetStatusChange, up to its whole timeout
+        self.list_context = None
+        self.list_lock = threading.Lock()  # Registry thread and GUI both enumerate
+
+    def list_readers(self):
+        scard = self.scard
+        with self.list_lock:
+            if self.list_context is None:
+                hresult, self.list_context = scard.SCardEstablishContext(scard.SCARD_SCOPE_USER)
+                if hresult != scard.SCARD_S_SUCCESS:
+                    self.list_context = None
+                    raise Exception(f"Could not establish PC/SC context: {scard.SCardGetErrorMessage(hresult)}")
+            hresult, names = scard.SCardListReaders(self.list_context, [])
+        if hresult == scard.SCARD_E_NO_READERS_AVAILABLE:
+            return []
+        if hresult != scard.SCARD_S_SUCCESS:
+            raise Exception(f"Could not list readers: {scard.SCardGetErrorMessage(hresult)}")
+        return list(names)
+
+    def connect(self, reader_name):
+        # Straight to the named reader, without enumerating them all again
+        from smartcard.pcsc.PCSCReader import PCSCReader
+        connection = PCSCReader(reader_name).createConnection()
+        connection.connect()
+        return connection
+
+    def begin_transaction(self, connection):
+        # Locks the card against every other PC/SC context until end_transaction
+        scard = self.scard
+        hresult = scard.SCardBeginTransaction(getattr(connection, "component", connection).hcard)
+        if hresult != scard.SCARD_S_SUCCESS:
+            raise Exception(f"Could not begin transaction: {scard.SCardGetErrorMessage(hresult)}")
+
+    def end_transaction(self, connection):
+        scard = self.scard
+        scard.SCardEndTransaction(getattr(connection, "component", connection).hcard, scard.SCARD_LEAVE_CARD)
+
+    def wait_for_reader_change(self, timeout=None):
+        """Block until a reader is attached or removed; False on timeout or cancel."""
+        scard = self.scard
+        if self.pnp_context is None:
+            hresult, self.pnp_context = scard.SCardEstablishContext(scard.SCARD_SCOPE_USER)
+            if hresult != scard.SCARD_S_SUCCESS:
+                raise Exception(f"Could not establish PC/SC context: {scard.SCardGetErrorMessage(hresult)}")
+        timeout_ms = scard.INFINITE if timeout is None else int(timeout * 1000)
+        hresult, states = scard.SCardGetStatusChange(self.pnp_context, timeout_ms, [(PNP_NOTIFICATION, self.pnp_state)])
+        if hresult in (scard.SCARD_E_TIMEOUT, scard.SCARD_E_CANCELLED):
+            return False
+        if hresult != scard.SCARD_S_SUCCESS:
+            raise Exception(f"Reader change wait failed: {scard.SCardGetErrorMessage(hresult)}")
+        name, event_state, atr = states[0]
+        if event_state & scard.SCARD_STATE_UNKNOWN:
+            raise Exception("PC/SC service does not support reader change notifications")
+        self.pnp_state = event_state & ~scard.SCARD_STATE_CHANGED
+        return bool(event_state & scard.SCARD_STATE_CHANGED)
+
+    def cancel_reader_wait(self):
+        if self.pnp_context is not None:
+            self.scard.SCardCancel(self.pnp_context)
+
+    def wait_for_card_events(self, reader_names, timeout=None):
+        """Block until a card is inserted or removed on one of reader_names.
+
+        Returns a list of (reader_name, present) tuples; the list is empty on
+        timeout or when cancel() was called.
+        """
+        scard = self.scard
+        timeout_ms = scard.INFINITE if timeout is None else int(timeout * 1000)
+        states = [(name, self.reader_states.get(name, scard.SCARD_STATE_UNAWARE)) for name in reader_names]
+        hresult, new_states = scard.SCardGetStatusChange(self.context, timeout_ms, states)
+        if hresult in (scard.SCARD_E_TIMEOUT, scard.SCARD_E_CANCELLED):
+            return []
+        if hresult != scard.SCARD_S_SUCCESS:
+            raise Exception(f"Status change failed: {scard.SCardGetErrorMessage(hresult)}")
+
+        events = []
+        for name, event_state, atr in new_states:
+            if event_state & scard.SCARD_STATE_CHANGED:
+                events.append((name, bool(event_state & scard.SCARD_STATE_PRESENT)))
+            self.reader_states[name] = event_state & ~scard.SCARD_STATE_CHANGED
+        return events
+
+    def cancel(self):
+        self.scard.SCardCancel(self.context)
+
+
+def wait_for_card(backend, reader_name, present, stop=None, on_poll=None, poll=0.5):
+    """Block until a tag is placed on (present) or taken off reader_name.
+
+    Waits in short slices rather than one INFINITE SCardGetStatusChange, so
+    Ctrl+C and stop (a threading or multiprocessing Event) are noticed within
+    poll seconds; on_poll() runs once per slice, e.g. to refresh a heartbeat.
+    Returns False if stop was set first.
+    """
+    while stop is None or not stop.is_set():
+        if on_poll:
+            on_poll()
+        for name, now_present in backend.wait_for_card_events([reader_name], timeout=poll):
+            if name == reader_name and now_present == present:
+                return True
+    return False
+
+
+class CardMonitor:
+    """Watches a set of readers on a background thread and calls
+    callback(reader_name, present) whenever a tag is placed or removed.
+
+    The callback runs on the monitor thread; the GUI forwards it through a Qt
+    signal so the handlers still execute on the GUI thread.
+    """
+
+    def __init__(self, backend, callback, on_error=None):
+        self.backend = backend
+        self.callback = callback
+        self.on_error = on_error
+        self.reader_names = []
+        self.present = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+        self.rearm_interval = 5.0
+
+    def watch(self, reader_names):
+        with self.lock:
+            names = sorted(set(name for name in reader_names if name))
+            if names == self.reader_names:
+                return
+            self.reader_names = names
+            for name in list(self.present):
+                if name not in names:
+                    del self.present[name]
+        self.wake.set()
+        self.backend.cancel()
+
+    def is_present(self, reader_name):
+        with self.lock:
+            return self.present.get(reader_name, False)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="card-monitor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        self.backend.cancel()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def _run(self):
+        while self.running:
+            with self.lock:
+                names = list(self.reader_names)
+            if not names:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+
+            self.wake.clear()
+            try:
+                # The timeout is only a safety net for a watch() that lands just
+                # before the wait starts; normally the call returns on an event.
+                events = self.backend.wait_for_card_events(names, timeout=self.rearm_interval)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(str(e))
+                # Reader probably unplugged; back off instead of spinning
+                self.wake.wait(1.0)
+                continue
+
+            for name, present in events:
+                with self.lock:
+                    if name not in self.reader_names or self.present.get(name) == present:
+                        continue
+                    self.present[name] = present
+                self.callback(name, present)
@@ -0,0 +1,327 @@
+"""Write station with one process per reader.
+
+The threaded WriteStation shares one interpreter, so with many readers the
+pyscard calls, NDEF encoding and the Qt event loop all compete for the GIL.
+Here every reader runs its own engine in a separate process with its own
+PC/SC context. The parent only dispatches jobs: a reader process asks for a
+job when a tag is placed, and reports each state back over a queue. The
+parent applies those states to the shared JobQueue and the journal.
+
+Per-reader status, counters and a heartbeat live in a shared-memory array
+that each process writes and the GUI reads without locks or messages. A
+reader that hangs in a transmit only stops its own heartbeat; the dispatcher
+never waits on a particular reader.
+
+Readers that ask for a job at the same time are served healthiest first
+when a HealthMonitor is given, and quarantined readers get no job at all.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+
+from ndef import normalize_url, InvalidURL
+from ntag import READER_FAULT, TAG_FAULT
+from pcsc import wait_for_card
+from station import IDLE, WRITING, DONE, FAILED, FINISHED, QUARANTINED
+
+STALLED = "stalled"
+STATUSES = (IDLE, WRITING, DONE, FAILED, FINISHED, QUARANTINED)
+
+# Shared board layout, one row of doubles per reader
+STATUS, WRITTEN, ERRORS, APDUS, HEARTBEAT = range(5)
+FIELDS = 5
+
+STALL_SECONDS = 5.0  # A busy reader refreshes its heartbeat at least this often
+POLL_SECONDS = 0.5
+
+
+def pcsc_backend(reader_name):
+    from pcsc import PCSCBackend
+    return PCSCBackend()
+
+
+def simulated_backend(reader_name, latency=0.0, byte_latency=0.0):
+    # A private simulated reader; use swap_tags so the process feeds itself tags
+    from simulator import SimulatedBackend
+    return SimulatedBackend([reader_name], latency, byte_latency)
+
+
+class Board:
+    """Per-reader view of the shared status array."""
+
+    def __init__(self, array, index):
+        self.array = array
+        self.offset = index * FIELDS
+
+    def get(self, field):
+        return self.array[self.offset + field]
+
+    def set(self, field, value):
+        self.array[self.offset + field] = value
+
+    def status(self, status):
+        self.set(STATUS, STATUSES.index(status))
+        self.beat()
+
+    def beat(self):
+        self.set(HEARTBEAT, time.time())
+
+
+def reader_process(index, reader_name, backend_factory, verify, lock, swap_tags, jobs_in, events_out, array, stop):
+    """Engine for one reader, run in its own process."""
+    from ntag import TagIO, fault_of, ProfileCache, write_job
+
+    board = Board(array, index)
+    board.status(IDLE)
+    backend = backend_factory(reader_name)
+    profiles = ProfileCache()
+    fast_read = True
+    while not stop.is_set():
+        if swap_tags:
+            backend.insert(reader_name=reader_name)
+        if not wait_for_card(backend, reader_name, True, stop, board.beat, POLL_SECONDS):
+            break
+
+        events_out.put(("ready", index))
+        job = jobs_in.get()
+        if job is None:
+            board.status(FINISHED)
+        elif job is False:
+            board.status(QUARANTINED)
+        else:
+            job_index, url = job
+            board.status(WRITING)
+            tag = None
+            start = time.perf_counter()
+            try:
+                # A PC/SC transaction keeps the GUI's Read tab off this reader
+                # until the tag is written and locked
+                # Every APDU beats, so only a transmit that hangs looks stalled
+                tag = TagIO(backend.connect(reader_name), fast_read, lambda *apdu: board.beat())
+                backend.begin_transaction(tag.connection)
+                record = lambda state, **fields: events_out.put(("state", index, state, fields))
+                done = write_job(tag, profiles, url, verify, lock, record)
+                fast_read = tag.fast_read_supported
+                events_out.put(("done", index, done.uid, done.url, done.profile.name,
+                                time.perf_counter() - start, tag.apdus, len(done.write.retried)))
+                board.set(WRITTEN, board.get(WRITTEN) + 1)
+                board.status(DONE)
+            except Exception as e:
+                events_out.put(("failed", index, str(e), fault_of(e)))
+                board.set(ERRORS, board.get(ERRORS) + 1)
+                board.status(FAILED)
+            finally:
+                if tag is not None:
+                    board.set(APDUS, board.get(APDUS) + tag.apdus)
+                    try:
+                        backend.end_transaction(tag.connection)
+                    except Exception:
+                        pass
+                    try:
+                        tag.connection.disconnect()
+                    except Exception:
+                        pass
+
+        if swap_tags:
+            backend.remove(reader_name)
+        if not wait_for_card(backend, reader_name, False, stop, board.beat, POLL_SECONDS):
+            break
+        board.status(IDLE)
+
+
+class ProcessStation:
+    def __init__(self, backend_factory, jobs, reader_names, verify=True, lock=True, journal=None,
+                 batch=None, locked_tags=None, health=None, swap_tags=False, on_status=None):
+        self.backend_factory = backend_factory
+        self.jobs = jobs
+        self.reader_names = list(reader_names)
+        self.verify = verify
+        self.lock = lock
+        self.journal = journal
+        self.batch = batch
+        self.locked_tags = locked_tags
+        self.swap_tags = swap_tags
+        self.health = health
+        self.on_status = on_status
+        # spawn, not fork: the parent has Qt and PC/SC threads running
+        self.context = multiprocessing.get_context("spawn")
+        self.array = self.context.RawArray("d", len(self.reader_names) * FIELDS)
+        self.stop_event = self.context.Event()
+        self.events = self.context.Queue()
+        self.job_queues = []
+        self.processes = []
+        self.in_flight = {}  # Reader index -> Job it is writing
+        self.ready = []  # Reader indices with a tag placed, waiting for a job
+        self.dispatcher = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        for index, name in enumerate(self.reader_names):
+            jobs_in = self.context.Queue()
+            process = self.context.Process(
+                target=reader_process, name=f"reader-{index}", daemon=True,
+                args=(index, name, self.backend_factory, self.verify, self.lock, self.swap_tags,
+                      jobs_in, self.events, self.array, self.stop_event),
+            )
+            process.start()
+            self.job_queues.append(jobs_in)
+            self.processes.append(process)
+        self.dispatcher = threading.Thread(target=self._dispatch, name="station-dispatcher", daemon=True)
+        self.dispatcher.start()
+
+    def stop(self, timeout=2, wait=True):
+        """Stop every reader process; wait=False reaps them on a background thread."""
+        self.running = False
+        self.stop_event.set()
+        for jobs_in in self.job_queues:
+            jobs_in.put(None)
+        if wait:
+            self._reap(timeout)
+        else:
+            threading.Thread(target=self._reap, args=(timeout,), name="station-stop", daemon=True).start()
+
+    def _reap(self, timeout):
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()  # Stuck in a transmit; its job is requeued below
+        if self.dispatcher:
+            self.dispatcher.join(timeout)
+        # Tags finished while stopping still reported done; handle those
+        # before giving the rest back, or their jobs would be written twice
+        while True:
+            try:
+                self._handle(self.events.get(timeout=0.1))
+            except queue.Empty:
+                break
+        for index in list(self.in_flight):
+            self._fail(index, "Station stopped", fault=None)
+
+    def on_card_event(self, reader_name, present):
+        pass  # Each reader process watches its own reader
+
+    def statuses(self):
+        """Reader name -> status, read straight from shared memory."""
+        now = time.time()
+        result = {}
+        for index, name in enumerate(self.reader_names):
+            board = Board(self.array, index)
+            status = STATUSES[int(board.get(STATUS))]
+            if status == WRITING and now - board.get(HEARTBEAT) > STALL_SECONDS:
+                status = STALLED
+            result[name] = status
+        return result
+
+    def counters(self):
+        return {
+            name: {
+                "written": int(self.array[index * FIELDS + WRITTEN]),
+                "errors": int(self.array[index * FIELDS + ERRORS]),
+                "apdus": int(self.array[index * FIELDS + APDUS]),
+            }
+            for index, name in enumerate(self.reader_names)
+        }
+
+    # Dispatcher thread
+
+    def _record(self, job, state, **fields):
+        if self.journal:
+            self.journal.record(self.batch, job.index, state, url=job.url, **fields)
+
+    def _status(self, index, status, detail=None):
+        if self.on_status:
+            self.on_status(self.reader_names[index], status, detail)
+
+    def _next_job(self):
+        while True:
+            job = self.jobs.take()
+            if job is None:
+                return None
+            try:
+                normalize_url(job.url)
+                return job
+            except InvalidURL as e:
+                self.jobs.skip(job)
+                self._record(job, "skipped", error=str(e))
+
+    def _fail(self, index, error, fault=READER_FAULT):
+        # fault as from ntag.fault_of, or None when nobody is to blame; see WriteStation
+        job = self.in_flight.pop(index)
+        self._record(job, "failed", error=error)
+        if fault in (TAG_FAULT, None):
+            self.jobs.release(job, error)
+        elif self.jobs.fail(job, error):
+            self._record(job, "skipped", error=error)
+        if self.health and fault == READER_FAULT and self.health.record(self.reader_names[index], False):
+            self._status(index, QUARANTINED, error)
+        else:
+            self._status(index, FAILED, error)
+
+    def _serve_ready(self):
+        ready, self.ready = self.ready, []
+        if self.health:
+            names = [self.reader_names[index] for index in ready]
+            ranked = self.health.rank(names)
+            for index in ready:
+                if self.reader_names[index] not in ranked:
+                    self.job_queues[index].put(False)
+                    self._status(index, QUARANTINED)
+            ready = [self.reader_names.index(name) for name in ranked]
+        for index in ready:
+            job = self._next_job() if self.running else None
+            if job is None:
+                self.job_queues[index].put(None)
+                self._status(index, FINISHED)
+                continue
+            self.in_flight[index] = job
+            self._record(job, "writing")
+            self.job_queues[index].put((job.index, job.url))
+            self._status(index, WRITING, job)
+
+    def _dispatch(self):
+        while self.running:
+            # A reader process that died mid-write gives its job back; checked
+            # every pass, since busy readers keep the queue from timing out
+            for index, process in enumerate(self.processes):
+                if index in self.in_flight and not process.is_alive():
+                    self._fail(index, "Reader process exited")
+            try:
+                event = self.events.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                continue
+
+            # Take everything already queued, so readers that became ready
+            # together can be served in health order
+            events = [event]
+            while True:
+                try:
+                    events.append(self.events.get_nowait())
+                except queue.Empty:
+                    break
+            for event in events:
+                self._handle(event)
+            self._serve_ready()
+
+    def _handle(self, event):
+        kind, index = event[0], event[1]
+        if kind == "ready":
+            self.ready.append(index)
+        elif index not in self.in_flight:
+            pass  # From a process already given up on as dead
+        elif kind == "state":
+            state, fields = event[2:]
+            self._record(self.in_flight[index], state, **fields)
+        elif kind == "done":
+            uid, url, profile_name, seconds, apdus, retries = event[2:]
+            job = self.in_flight.pop(index)
+            if self.health:
+                self.health.record(self.reader_names[index], True, seconds, apdus, retries)
+            if self.lock and self.locked_tags:
+                self.locked_tags.put(uid, url, profile_name)
+            self.jobs.complete(job)
+            self._status(index, DONE, job)
+        elif kind == "failed":
+            self._fail(index, event[2], event[3])
@@ -0,0 +1,73 @@
+"""Reader registry: one cached reader list, kept current by PC/SC itself.
+
+A background thread blocks on the backend's reader-change notification (the
+\\\\?PnP?\\Notification pseudo-reader on PC/SC) and enumerates the readers
+once per change. Both tabs read the cached list instead of enumerating on
+their own, and callback(names) fires whenever a reader is plugged in or
+pulled out, so a replugged reader is back within a moment.
+"""
+import threading
+
+
+class ReaderRegistry:
+    def __init__(self, backend, callback, on_error=None):
+        self.backend = backend
+        self.callback = callback
+        self.on_error = on_error
+        self.reader_names = []
+        self.lock = threading.Lock()
+        self.running = False
+        self.stopped = threading.Event()
+        self.thread = None
+        self.rearm_interval = 5.0
+        self.last_error = None
+
+    def names(self):
+        with self.lock:
+            return list(self.reader_names)
+
+    def refresh(self, notify=True):
+        """Enumerate now; returns the new list and calls back if it changed."""
+        names = list(self.backend.list_readers())
+        with self.lock:
+            changed = names != self.reader_names
+            self.reader_names = names
+        if changed and notify:
+            self.callback(names)
+        return names
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="reader-registry", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.stopped.set()
+        self.backend.cancel_reader_wait()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def _run(self):
+        while self.running:
+            try:
+                changed = self.backend.wait_for_reader_change(timeout=self.rearm_interval)
+                if changed and self.running:
+                    self.refresh()
+                self.last_error = None
+            except Exception as e:
+                # Report once, not every second while it keeps failing
+                if self.on_error and str(e) != self.last_error:
+                    self.on_error(str(e))
+                self.last_error = str(e)
+                # Fall back to enumerating once a second if notifications fail
+                if self.stopped.wait(1.0):
+                    break
+                try:
+                    self.refresh()
+                except Exception:
+                    pass
@@ -0,0 +1,330 @@
+"""Simulated ACR-1252 readers with NTAG213/215/216 tags.
+
+SimulatedBackend has the same interface as pcsc.PCSCBackend, so it can be
+handed to NFCApp, the card monitor or any headless tool in place of pyscard.
+Tags keep real page memory, CC, static and dynamic lock bytes and answer
+GET UID, READ BINARY, UPDATE BINARY and, through the direct-transmit
+pseudo-APDU, GET_VERSION, READ, FAST_READ and WRITE. Cards are inserted and
+removed from code, and every APDU can be given a latency.
+"""
+import itertools
+import os
+import threading
+import time
+
+from ntag import NTAG213, NTAG215, FIRST_USER_PAGE
+
+
+def reader_name(index):
+    """Name for the index-th simulated ACR-1252, matching the PC/SC style."""
+    return f"ACS ACR1252 1S CL Reader [ACR1252 Dual Reader PICC] 0{index} 00"
+
+
+DEFAULT_READER = reader_name(0)
+
+SW_OK = (0x90, 0x00)
+SW_NAK = (0x63, 0x00)
+SW_NOT_SUPPORTED = (0x6A, 0x81)
+
+# GET_VERSION response up to the storage size byte, which comes from the profile
+VERSION_HEADER = [0x00, 0x04, 0x04, 0x02, 0x01, 0x00]
+
+_uid_counter = None
+_uid_pid = None
+
+
+def next_uid():
+    """A UID no other process will hand out: the pid is in the top bits.
+
+    Station processes each build their own tags, so a per-module counter
+    starting at 1 would give every process the same UIDs.
+    """
+    global _uid_counter, _uid_pid
+    if _uid_pid != os.getpid():  # Also catches a forked copy of the counter
+        _uid_pid = os.getpid()
+        _uid_counter = itertools.count(((_uid_pid & 0x3FFFFF) << 26) + 1)
+    return bytes([0x04]) + next(_uid_counter).to_bytes(6, "big")
+
+
+class SimulatedTag:
+    def __init__(self, profile=NTAG213, uid=None):
+        self.profile = profile
+        if uid is None:
+            uid = next_uid()
+        self.uid = bytes(uid)
+        self.memory = bytearray(profile.total_pages * 4)
+        self.memory[0:3] = self.uid[0:3]
+        self.memory[3] = 0x88 ^ self.uid[0] ^ self.uid[1] ^ self.uid[2]  # BCC0
+        self.memory[4:8] = self.uid[3:7]
+        self.memory[8] = self.uid[3] ^ self.uid[4] ^ self.uid[5] ^ self.uid[6]  # BCC1
+        self.memory[9] = 0x48
+        # Factory state: NDEF formatted CC and an empty NDEF TLV
+        self.memory[12:16] = bytes([0xE1, 0x10, profile.cc_size, 0x00])
+        self.memory[16:20] = bytes([0x03, 0x00, 0xFE, 0x00])
+        self.writes = 0
+
+    def version(self):
+        return bytes(VERSION_HEADER + [self.profile.storage_size, 0x03])
+
+    def page(self, page):
+        return bytes(self.memory[page * 4:page * 4 + 4])
+
+    def read(self, page):
+        # READ returns four pages and rolls over at the end of memory
+        if page >= self.profile.total_pages:
+            raise Exception(f"Page {page} out of range")
+        return b"".join(self.page((page + i) % self.profile.total_pages) for i in range(4))
+
+    def fast_read(self, first, last):
+        if first > last or last >= self.profile.total_pages:
+            raise Exception(f"Pages {first}-{last} out of range")
+        return bytes(self.memory[first * 4:(last + 1) * 4])
+
+    def is_locked(self, page):
+        lock0, lock1 = self.memory[10], self.memory[11]
+        if page < 3:
+            return page < 2
+        if page == 3:
+            return bool(lock0 & 0x08)
+        if page < 8:
+            return bool(lock0 & (1 << page))
+        if page < 16:
+            return bool(lock1 & (1 << (page - 8)))
+        if page <= self.profile.user_end:
+            dynamic = self.memory[self.profile.dynamic_lock_page * 4:self.profile.dynamic_lock_page * 4 + 2]
+            pages_per_bit = 2 if self.profile is NTAG213 else 16
+            bit = (page - 16) // pages_per_bit
+            return bit < 16 and bool(dynamic[bit // 8] & (1 << (bit % 8)))
+        return False
+
+    def write(self, page, data):
+        if len(data) != 4 or page >= self.profile.total_pages or self.is_locked(page):
+            raise Exception(f"Write refused at page {page}")
+        offset = page * 4
+        if page == 2:
+            # Serial number bytes are read-only; lock bytes can only be set
+            self.memory[offset + 2] |= data[2]
+            self.memory[offset + 3] |= data[3]
+        elif page == 3 or page == self.profile.dynamic_lock_page:
+            for i in range(4):  # One-time programmable
+                self.memory[offset + i] |= data[i]
+        else:
+            self.memory[offset:offset + 4] = bytes(data)
+        self.writes += 1
+
+    def user_data(self):
+        return bytes(self.memory[FIRST_USER_PAGE * 4:(self.profile.user_end + 1) * 4])
+
+
+class SimulatedConnection:
+    def __init__(self, reader, tag):
+        self.reader = reader
+        self.tag = tag
+        self.connected = True
+
+    def transmit(self, apdu):
+        reader = self.reader
+        if reader.latency or reader.byte_latency:
+            time.sleep(reader.latency + reader.byte_latency * len(apdu))
+        if not self.connected:
+            raise Exception("Connection is closed")
+        if reader.tag is not self.tag:
+            raise Exception("Card was removed")
+        with reader.lock:
+            reader.apdus += 1
+            reader.bytes_sent += len(apdu)
+            data, (sw1, sw2) = self._dispatch(list(apdu))
+            reader.bytes_received += len(data) + 2
+        return list(data), sw1, sw2
+
+    def _dispatch(self, apdu):
+        tag = self.tag
+        if apdu[:2] == [0xFF, 0xCA]:
+            return tag.uid, SW_OK
+        if apdu[:2] == [0xFF, 0xB0]:
+            length = apdu[4] or 16
+            try:
+                return tag.read(apdu[3])[:length], SW_OK
+            except Exception:
+                return b"", SW_NAK
+        if apdu[:2] == [0xFF, 0xD6]:
+            try:
+                tag.write(apdu[3], apdu[5:9])
+                return b"", SW_OK
+            except Exception:
+                return b"", SW_NAK
+        if apdu[:4] == [0xFF, 0x00, 0x00, 0x00]:
+            if not self.reader.direct_transmit:
+                return b"", SW_NOT_SUPPORTED
+            return self._native(apdu[5:5 + apdu[4]])
+        return b"", SW_NOT_SUPPORTED
+
+    def _native(self, command):
+        tag = self.tag
+        try:
+            if command[0] == 0x60:
+                return tag.version(), SW_OK
+            if command[0] == 0x30:
+                return tag.read(command[1]), SW_OK
+            if command[0] == 0x3A:
+                return tag.fast_read(command[1], command[2]), SW_OK
+            if command[0] == 0xA2:
+                tag.write(command[1], command[2:6])
+                return b"", SW_OK
+        except Exception:
+            pass
+        return b"", SW_NAK
+
+    def disconnect(self):
+        self.connected = False
+
+
+class SimulatedReader:
+    def __init__(self, name, latency=0.0, byte_latency=0.0, direct_transmit=True):
+        self.name = name
+        self.latency = latency
+        self.byte_latency = byte_latency
+        self.direct_transmit = direct_transmit
+        self.tag = None
+        self.lock = threading.Lock()
+        self.transaction = threading.Lock()  # Stands in for SCardBeginTransaction
+        self.apdus = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def reset_counters(self):
+        with self.lock:
+            self.apdus = 0
+            self.bytes_sent = 0
+            self.bytes_received = 0
+
+
+class SimulatedBackend:
+    def __init__(self, reader_names=(DEFAULT_READER,), latency=0.0, byte_latency=0.0, direct_transmit=True):
+        self.readers = {}
+        self.condition = threading.Condition()
+        self.reported = {}
+        self.waiting = 0
+        self.cancelled = False
+        self.reported_readers = None
+        self.reader_wait_cancelled = False
+        for name in reader_names:
+            self.add_reader(name, latency, byte_latency, direct_transmit)
+
+    def add_reader(self, name, latency=0.0, byte_latency=0.0, direct_transmit=True):
+        with self.condition:
+            reader = SimulatedReader(name, latency, byte_latency, direct_transmit)
+            self.readers[name] = reader
+            self.condition.notify_all()
+            return reader
+
+    def remove_reader(self, name):
+        with self.condition:
+            self.readers.pop(name, None)
+            self.reported.pop(name, None)
+            self.condition.notify_all()
+
+    def insert(self, tag=None, reader_name=None):
+        tag = tag or SimulatedTag()
+        with self.condition:
+            self._reader(reader_name).tag = tag
+            self.condition.notify_all()
+        return tag
+
+    def remove(self, reader_name=None):
+        with self.condition:
+            reader = self._reader(reader_name)
+            tag, reader.tag = reader.tag, None
+            self.condition.notify_all()
+        return tag
+
+    def _reader(self, reader_name):
+        if reader_name is None:
+            reader_name = next(iter(self.readers))
+        if reader_name not in self.readers:
+            raise Exception(f"Reader not found: {reader_name}")
+        return self.readers[reader_name]
+
+    # PCSCBackend interface
+
+    def list_readers(self):
+        with self.condition:
+            return list(self.readers)
+
+    def connect(self, reader_name):
+        reader = self._reader(reader_name)
+        if reader.tag is None:
+            raise Exception("No card in reader")
+        return SimulatedConnection(reader, reader.tag)
+
+    def begin_transaction(self, connection):
+        connection.reader.transaction.acquire()
+
+    def end_transaction(self, connection):
+        connection.reader.transaction.release()
+
+    def wait_for_card_events(self, reader_names, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            self.waiting += 1
+            try:
+                while True:
+                    for name in reader_names:
+                        if name not in self.readers:
+                            raise Exception(f"Reader not found: {name}")
+                    events = [
+                        (name, self.readers[name].tag is not None) for name in reader_names
+                        if self.reported.get(name) != (self.readers[name].tag is not None)
+                    ]
+                    if events:
+                        for name, present in events:
+                            self.reported[name] = present
+                        return events
+                    if self.cancelled:
+                        return []
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return []
+                    self.condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+                if not self.waiting:
+                    self.cancelled = False
+
+    def cancel(self):
+        # Like SCardCancel, only affects calls that are currently blocked
+        with self.condition:
+            if self.waiting:
+                self.cancelled = True
+                self.condition.notify_all()
+
+    def wait_for_reader_change(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                if set(self.readers) != self.reported_readers:
+                    self.reported_readers = set(self.readers)
+                    return True
+                if self.reader_wait_cancelled:
+                    self.reader_wait_cancelled = False
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+
+    def cancel_reader_wait(self):
+        with self.condition:
+            self.reader_wait_cancelled = True
+            self.condition.notify_all()
+
+
+def backend_from_env():
+    """SimulatedBackend when NFC_SIMULATE=N is set (N readers), else None."""
+    count = os.environ.get("NFC_SIMULATE")
+    if not count:
+        return None
+    backend = SimulatedBackend([reader_name(i) for i in range(int(count))])
+    for name in backend.list_readers():
+        backend.insert(SimulatedTag(NTAG215), name)
+    return backend
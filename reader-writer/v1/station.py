@@ -0,0 +1,147 @@
+"""Write station: every attached reader writes from one shared job queue.
+
+Each reader gets its own DeviceWorker, so a slow tag or a hung reader only
+holds up that reader. Card events come from a single CardMonitor watching
+all of them (the caller owns it and forwards events to on_card_event); a
+tag placed on any idle reader takes the next job, is written, verified and
+locked, and the reader reports its status through on_status. With a
+HealthMonitor, every tag feeds the reader's health score and a reader that
+keeps failing is quarantined: tags placed on it are left alone until it
+comes back. Only transport and APDU failures count against the reader, and
+only a job that can't fit the tag uses up the job's attempts; a foreign
+locked tag or an unsupported tag is nobody's fault but the tag's. Given the GUI's ReaderArbiter, the station shares its connections
+and writes inside arbiter sessions, so the Read tab can't interleave with a
+station write on the same reader.
+"""
+from functools import partial
+import threading
+import time
+
+from arbiter import ReaderArbiter
+from ndef import normalize_url, InvalidURL
+from ntag import TagIO, ProfileCache, fault_of, READER_FAULT, TAG_FAULT, write_job
+from worker import DeviceWorker
+
+# Status reported per reader through on_status(reader_name, status, detail)
+IDLE = "idle"           # No tag on the reader
+WRITING = "writing"
+DONE = "done"           # Written and locked; waiting for the tag to be removed
+FAILED = "failed"       # The job went back to the queue; waiting for removal
+FINISHED = "finished"   # A tag was placed but no jobs are left
+QUARANTINED = "quarantined"  # Too many failures; gets no jobs for a while
+
+
+class WriteStation:
+    def __init__(self, backend, jobs, reader_names, verify=True, lock=True,
+                 journal=None, batch=None, locked_tags=None, health=None, arbiter=None, on_status=None):
+        self.backend = backend
+        self.jobs = jobs
+        self.reader_names = list(reader_names)
+        self.verify = verify
+        self.lock = lock
+        self.journal = journal
+        self.batch = batch
+        self.locked_tags = locked_tags
+        self.health = health
+        self.on_status = on_status
+        self.arbiter = arbiter or ReaderArbiter(backend)
+        self.connections = self.arbiter.connections
+        self.workers = {}
+        self.profiles = {}
+        self.fast_read_supported = {}
+        self.status = {}
+        self.status_lock = threading.Lock()
+        self.running = True
+        for index, name in enumerate(self.reader_names):
+            self.workers[name] = DeviceWorker(f"station-{index}")
+            self.profiles[name] = ProfileCache()  # Only ever touched by that reader's worker
+            self.status[name] = IDLE
+
+    def on_card_event(self, reader_name, present):
+        # Safe to call from the card monitor thread
+        worker = self.workers.get(reader_name)
+        if worker:
+            worker.submit(self._handle_card, reader_name, present)
+
+    def stop(self, wait=True):
+        """Stop taking tags. With wait=False nothing is joined: each worker
+        finishes the tag in hand and exits on its own, so the GUI never
+        waits on a busy reader."""
+        self.running = False
+        for name, worker in self.workers.items():
+            worker.submit(self.connections.invalidate, name)
+            worker.stop(wait)
+
+    def statuses(self):
+        with self.status_lock:
+            return dict(self.status)
+
+    def _set_status(self, reader_name, status, detail=None):
+        with self.status_lock:
+            self.status[reader_name] = status
+        if self.on_status:
+            self.on_status(reader_name, status, detail)
+
+    def _record(self, job, state, **fields):
+        if self.journal:
+            self.journal.record(self.batch, job.index, state, url=job.url, **fields)
+
+    # Everything below runs on the reader's own worker thread
+
+    def _handle_card(self, reader_name, present):
+        self.connections.invalidate(reader_name)
+        if not self.running:
+            return  # Queued before stop(); the tag is left alone
+        if not present:
+            self._set_status(reader_name, IDLE)
+            return
+        if self.health and self.health.is_quarantined(reader_name):
+            self._set_status(reader_name, QUARANTINED)
+            return
+
+        job = self.jobs.take()
+        if job is None:
+            self._set_status(reader_name, FINISHED)
+            return
+        try:
+            normalize_url(job.url)
+        except InvalidURL as e:
+            self.jobs.skip(job)
+            self._record(job, "skipped", error=str(e))
+            self._set_status(reader_name, FAILED, f"Skipped job {job.index + 1}, invalid URL: {job.url}")
+            return
+
+        self._set_status(reader_name, WRITING, job)
+        self._record(job, "writing")
+        start = time.perf_counter()
+        try:
+            tag, result = self._write_job(reader_name, job)
+        except Exception as e:
+            self.connections.invalidate(reader_name)
+            self._record(job, "failed", error=str(e))
+            fault = fault_of(e)
+            if fault == TAG_FAULT:
+                self.jobs.release(job, str(e))  # Locked or not an NTAG: the next tag gets the job
+            elif self.jobs.fail(job, str(e)):
+                self._record(job, "skipped", error=str(e))
+            if self.health and fault == READER_FAULT and self.health.record(reader_name, False):
+                self._set_status(reader_name, QUARANTINED, str(e))
+            else:
+                self._set_status(reader_name, FAILED, str(e))
+            return
+        if self.health:
+            self.health.record(reader_name, True, time.perf_counter() - start, tag.apdus, len(result.retried))
+        self.jobs.complete(job)
+        self._set_status(reader_name, DONE, job)
+
+    def _write_job(self, reader_name, job):
+        with self.arbiter.session(reader_name, write=True) as connection:
+            return self._write_tag(reader_name, connection, job)
+
+    def _write_tag(self, reader_name, connection, job):
+        tag = TagIO(connection, self.fast_read_supported.get(reader_name, True))
+        done = write_job(tag, self.profiles[reader_name], job.url, self.verify, self.lock, partial(self._record, job))
+        self.fast_read_supported[reader_name] = tag.fast_read_supported
+        if self.lock and self.locked_tags:
+            self.locked_tags.put(done.uid, done.url, done.profile.name)
+        return tag, done.write
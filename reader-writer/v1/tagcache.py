@@ -0,0 +1,149 @@
+"""Persistent UID -> URL cache for locked tags.
+
+A locked tag can never change, so once its URL is known it never has to be
+read again: a cached tag resolves after the GET UID exchange alone. Entries
+come from tags this app locked (live, or imported from the job journal) and
+from the first read of any tag whose lock bytes are all set.
+
+The whole table is loaded into an LRU at start, so lookups never touch the
+disk. New entries update the LRU at once and reach SQLite from a background
+thread, like the journal, so a put inside a tag write never waits on a
+commit; the least recently seen ones are evicted once the cache holds more
+than size tags. The journal is imported incrementally: only tags locked
+since the last import are added, with the time they were locked.
+"""
+from collections import OrderedDict
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tags (
+    uid TEXT PRIMARY KEY,
+    url TEXT,
+    profile TEXT,
+    seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tags_seen ON tags (seen);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL
+);
+"""
+
+
+def default_path():
+    return os.path.join(os.path.expanduser("~"), ".local", "share", "nfc-writer", "tags.sqlite3")
+
+
+def uid_key(uid):
+    return uid.hex() if isinstance(uid, (bytes, bytearray)) else uid
+
+
+class LockedTagCache:
+    def __init__(self, path=None, size=100000):
+        self.path = path or default_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.size = size
+        self.lock = threading.Lock()  # The in-memory LRU
+        self.db_lock = threading.Lock()  # Writer thread and import share one connection
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.entries = OrderedDict(
+            (uid, (url, profile))
+            for uid, url, profile in self.db.execute("SELECT uid, url, profile FROM tags ORDER BY seen")
+        )
+        self.seen = {}  # uid -> time, saved in bulk rather than on every hit
+        self.hits = 0
+        self.misses = 0
+        self.pending = queue.Queue()  # (rows, evicted, imported) for the writer thread
+        self.thread = threading.Thread(target=self._run, name="tag-cache", daemon=True)
+        self.thread.start()
+
+    def get(self, uid):
+        """(url, profile name) for a cached locked tag, else None."""
+        uid = uid_key(uid)
+        with self.lock:
+            entry = self.entries.get(uid)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(uid)
+            self.seen[uid] = time.time()
+            return entry
+
+    def put(self, uid, url, profile=None):
+        self.put_many([(uid, url, profile)])
+
+    def put_many(self, tags, seen=None):
+        """Cache (uid, url, profile) tuples; returns without touching the disk.
+
+        seen gives each tag's own timestamp, else they are all seen now.
+        """
+        now = time.time()
+        with self.lock:
+            rows = []
+            for i, (uid, url, profile) in enumerate(tags):
+                uid = uid_key(uid)
+                if self.entries.get(uid, (None, None))[1] and profile is None:
+                    profile = self.entries[uid][1]  # The journal doesn't know the tag type
+                self.entries[uid] = (url, profile)
+                self.entries.move_to_end(uid)
+                self.seen.pop(uid, None)
+                rows.append((uid, url, profile, seen[i] if seen else now))
+            evicted = []
+            while len(self.entries) > self.size:
+                evicted.append((self.entries.popitem(last=False)[0],))
+            self.pending.put((rows, evicted, None))  # In LRU order for the writer
+
+    def import_journal(self, journal):
+        """Add tags locked since the last import, including ones from a crashed batch."""
+        with self.db_lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'journal_imported'").fetchone()
+        rows = journal.locked_tags(row[0] if row else 0.0)
+        if rows:
+            self.put_many([(uid, url.lower() if url else url, None) for uid, url, updated in rows],
+                          [updated for uid, url, updated in rows])
+            self.pending.put(([], [], rows[-1][2]))
+        return len(rows)
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join(timeout=5)
+        with self.lock:
+            seen = [(seen, uid) for uid, seen in self.seen.items()]
+        with self.db_lock:
+            with self.db:
+                self.db.executemany("UPDATE tags SET seen = ? WHERE uid = ?", seen)
+            self.db.close()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self.pending.get()
+            # Coalesce whatever else is already queued into the same commit
+            items = []
+            while item is not None:
+                items.append(item)
+                try:
+                    item = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+            stop = item is None
+            self._commit(items)
+
+    def _commit(self, items):
+        if not items:
+            return
+        with self.db_lock, self.db:
+            for rows, evicted, imported in items:
+                self.db.executemany("INSERT OR REPLACE INTO tags (uid, url, profile, seen) VALUES (?, ?, ?, ?)", rows)
+                self.db.executemany("DELETE FROM tags WHERE uid = ?", evicted)
+                if imported is not None:
+                    self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('journal_imported', ?)",
+                                    (imported,))
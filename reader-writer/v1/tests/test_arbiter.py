@@ -0,0 +1,77 @@
+import threading
+import time
+
+from arbiter import PriorityLock, ReaderArbiter
+from simulator import SimulatedBackend, reader_name
+
+READER = reader_name(0)
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert condition()
+
+
+def test_waiting_writer_goes_ahead_of_waiting_reader():
+    lock = PriorityLock()
+    order = []
+
+    def take(name, write):
+        lock.acquire(write)
+        order.append(name)
+        lock.release()
+
+    lock.acquire()  # A read in progress
+    reader = threading.Thread(target=take, args=("read", False))
+    reader.start()
+    time.sleep(0.05)  # The read queues up first
+    writer = threading.Thread(target=take, args=("write", True))
+    writer.start()
+    wait_until(lambda: lock.writers_waiting == 1)
+    lock.release()
+    reader.join(2)
+    writer.join(2)
+    assert order == ["write", "read"]
+
+
+def test_sessions_share_one_connection_and_never_overlap():
+    backend = SimulatedBackend([READER])
+    backend.insert(reader_name=READER)
+    arbiter = ReaderArbiter(backend)
+    inside = []
+    overlaps = []
+    connections = set()
+
+    def use(write):
+        for _ in range(20):
+            with arbiter.session(READER, write) as connection:
+                if inside:
+                    overlaps.append(write)
+                inside.append(write)
+                connections.add(id(connection))
+                connection.transmit([0xFF, 0xCA, 0x00, 0x00, 0x00])  # GET UID
+                inside.pop()
+
+    threads = [threading.Thread(target=use, args=(write,)) for write in (False, True, False, True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert not overlaps
+    assert len(connections) == 1
+    assert arbiter.connections.churn()["connects"] == 1
+
+
+def test_session_ends_cleanly_when_the_tag_is_pulled():
+    backend = SimulatedBackend([READER])
+    backend.insert(reader_name=READER)
+    arbiter = ReaderArbiter(backend)
+    with arbiter.session(READER, write=True):
+        backend.remove(READER)
+    # Neither the reader lock nor the transaction is left held
+    backend.insert(reader_name=READER)
+    arbiter.connections.invalidate(READER)
+    with arbiter.session(READER) as connection:
+        assert connection.transmit([0xFF, 0xCA, 0x00, 0x00, 0x00])
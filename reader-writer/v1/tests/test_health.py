@@ -0,0 +1,39 @@
+import time
+
+from health import HealthMonitor
+
+
+def test_faster_reader_ranks_first_and_untried_readers_go_first():
+    health = HealthMonitor()
+    health.record("slow", True, seconds=1.0, apdus=10)
+    health.record("fast", True, seconds=0.1, apdus=10)
+    assert health.rank(["slow", "fast", "new"]) == ["new", "fast", "slow"]
+
+
+def test_verify_retries_and_errors_lower_the_score():
+    health = HealthMonitor()
+    for name in ("clean", "retrying", "failing"):
+        health.record(name, True, seconds=0.1, apdus=10, retries=2 if name == "retrying" else 0)
+    health.record("failing", False)
+    assert health.rank(["failing", "retrying", "clean"])[0] == "clean"
+    assert health.score("retrying") > health.score("clean")
+    assert health.score("failing") > health.score("clean")
+
+
+def test_no_quarantine_before_min_samples():
+    health = HealthMonitor(min_samples=10)
+    assert not any(health.record("new", False) for _ in range(9))
+    assert health.record("new", False) is True
+
+
+def test_quarantine_and_clean_slate_after_it_expires():
+    health = HealthMonitor(min_samples=2, quarantine_seconds=0.05)
+    # The averaged error rate climbs 0.2, 0.36, 0.49, 0.59 and crosses 0.5 on the fourth
+    assert [health.record("bad", False) for _ in range(4)] == [False, False, False, True]
+    assert health.is_quarantined("bad")
+    assert health.rank(["bad", "good"]) == ["good"]
+    assert health.snapshot()["bad"]["quarantined"]
+
+    time.sleep(0.06)
+    assert not health.is_quarantined("bad")
+    assert health.snapshot()["bad"]["samples"] == 0
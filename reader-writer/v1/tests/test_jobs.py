@@ -0,0 +1,75 @@
+from jobs import iter_jobs, count_jobs, JobQueue
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_text_file_skips_blanks_and_comments(tmp_path):
+    path = write(tmp_path, "urls.txt", "https://a/1\n\n# comment\n  https://a/2  \n")
+    assert list(iter_jobs(path)) == ["https://a/1", "https://a/2"]
+    assert count_jobs(path) == 2
+
+
+def test_csv_uses_url_column(tmp_path):
+    path = write(tmp_path, "jobs.csv", "name,url\n,https://a/1\nshort\nb,\n# c,https://a/x\nc,https://a/2\n")
+    assert list(iter_jobs(path)) == ["https://a/1", "https://a/2"]
+
+
+def test_csv_without_header_uses_first_column(tmp_path):
+    path = write(tmp_path, "jobs.csv", "https://a/1,one\nhttps://a/2,two\n")
+    assert list(iter_jobs(path)) == ["https://a/1", "https://a/2"]
+
+
+def test_jsonl(tmp_path):
+    path = write(tmp_path, "jobs.jsonl", '{"url": "https://a/1"}\n\n{"url": "https://a/2", "n": 2}\n')
+    assert list(iter_jobs(path)) == ["https://a/1", "https://a/2"]
+
+
+def test_queue_order_and_progress():
+    jobs = JobQueue(["u0", "u1", "u2"], 3)
+    first = jobs.take()
+    assert (first.index, first.url, first.attempts) == (0, "u0", 1)
+    jobs.complete(first)
+    assert jobs.peek().url == "u1"
+    assert jobs.progress() == {"written": 1, "failed": 0, "skipped": 0, "total": 3}
+
+
+def test_failed_job_is_retried_first():
+    jobs = JobQueue(["u0", "u1"])
+    job = jobs.take()
+    assert jobs.fail(job, "boom") is False
+    retry = jobs.take()
+    assert retry is job and retry.attempts == 2 and retry.error == "boom"
+
+
+def test_job_is_skipped_after_max_attempts():
+    jobs = JobQueue(["u0", "u1"], max_attempts=2)
+    job = jobs.take()
+    jobs.fail(job)
+    assert jobs.take() is job
+    assert jobs.fail(job) is True
+    assert job.status == "skipped"
+    assert jobs.take().url == "u1"
+    assert jobs.progress()["skipped"] == 1
+    # Requeued jobs get a fresh set of attempts
+    assert jobs.requeue_skipped() == 1
+    assert jobs.take() is job and job.attempts == 1
+
+
+def test_skip_and_done():
+    jobs = JobQueue(["u0"])
+    job = jobs.take()
+    jobs.skip(job)
+    assert jobs.done()
+    assert jobs.take() is None
+
+
+def test_resume_skips_finished_rows():
+    jobs = JobQueue(["u0", "u1", "u2", "u3"], 4, finished={0, 2})
+    assert [jobs.take().url, jobs.take().url] == ["u1", "u3"]
+    assert jobs.take() is None
+    assert jobs.resumed == 2
+    assert jobs.progress()["written"] == 2
@@ -0,0 +1,92 @@
+import sqlite3
+
+from jobs import JobQueue
+from journal import Journal, batch_id, FINISHED, FINISHED_UNLOCKED
+from tagcache import LockedTagCache
+
+
+def test_resume_from_journal(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    journal = Journal(path)
+    journal.record("batch", 0, "writing", url="https://a/0")
+    journal.record("batch", 0, "locked", url="https://a/0", uid=b"\x04\x00")
+    journal.record("batch", 1, "writing", url="https://a/1")
+    journal.record("batch", 1, "written", url="https://a/1", uid=b"\x04\x01")
+    journal.record("batch", 2, "failed", url="https://a/2", error="boom")
+    journal.record("other", 3, "locked", url="https://a/3", uid=b"\x04\x03")
+    journal.close()
+
+    # A crash after close loses nothing: reopen and resume
+    journal = Journal(path)
+    assert journal.finished_jobs("batch") == {0}
+    assert journal.finished_jobs("batch", FINISHED_UNLOCKED) == {0, 1}
+    jobs = JobQueue(["https://a/0", "https://a/1", "https://a/2"], 3, journal.finished_jobs("batch", FINISHED))
+    assert [jobs.take().index for _ in range(2)] == [1, 2]
+    journal.close()
+
+
+def test_batch_id_changes_with_contents(tmp_path):
+    path = tmp_path / "jobs.txt"
+    path.write_text("https://a/1\n")
+    first = batch_id(str(path))
+    assert batch_id(str(path)) == first
+    path.write_text("https://b/1\n")
+    assert batch_id(str(path)) != first
+
+
+def test_failed_commit_is_kept_and_retried(tmp_path):
+    errors = []
+    journal = Journal(str(tmp_path / "journal.sqlite3"), flush_interval=0.01, on_error=errors.append)
+    commit = journal._commit
+    failures = [sqlite3.OperationalError("database is locked")] * 3
+
+    def flaky_commit(rows):
+        if rows and failures:
+            raise failures.pop()
+        commit(rows)
+
+    journal._commit = flaky_commit
+    journal.record("batch", 0, "locked", url="https://a/0", uid=b"\x04\x00")
+    journal.flush()
+    assert journal.finished_jobs("batch") == {0}
+    assert len(errors) == 1 and "database is locked" in errors[0]  # Reported once, not per retry
+    journal.record("batch", 1, "locked", url="https://a/1", uid=b"\x04\x01")
+    journal.close()
+    journal = Journal(str(tmp_path / "journal.sqlite3"))
+    assert journal.finished_jobs("batch") == {0, 1}
+    journal.close()
+
+
+def test_locked_tag_cache_imports_journal_once(tmp_path):
+    journal = Journal(str(tmp_path / "journal.sqlite3"))
+    journal.record("batch", 0, "locked", url="https://A/0", uid=b"\x04\x00")
+    journal.flush()
+
+    cache_path = str(tmp_path / "tags.sqlite3")
+    cache = LockedTagCache(cache_path)
+    assert cache.import_journal(journal) == 1
+    assert cache.get(b"\x04\x00") == ("https://a/0", None)
+    cache.put(b"\x04\x01", "https://a/1", "NTAG215")
+    cache.close()
+
+    cache = LockedTagCache(cache_path)
+    assert cache.import_journal(journal) == 0
+    assert cache.get("0401") == ("https://a/1", "NTAG215")
+    journal.record("batch", 1, "locked", url="https://a/2", uid=b"\x04\x02")
+    journal.flush()
+    assert cache.import_journal(journal) == 1
+    assert cache.hits == 1
+    cache.close()
+    journal.close()
+
+
+def test_locked_tag_cache_evicts_least_recent(tmp_path):
+    cache = LockedTagCache(str(tmp_path / "tags.sqlite3"), size=2)
+    cache.put("01", "https://a/1")
+    cache.put("02", "https://a/2")
+    cache.get("01")
+    cache.put("03", "https://a/3")
+    assert cache.get("02") is None
+    assert cache.get("01") and cache.get("03")
+    cache.close()
+    assert set(LockedTagCache(str(tmp_path / "tags.sqlite3"), size=2).entries) == {"01", "03"}
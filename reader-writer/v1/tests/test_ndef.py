@@ -0,0 +1,122 @@
+import pytest
+
+from ndef import (
+    encode_url, encode_tag_data, encode_message, decode_message, decode_tag_data, decode_url,
+    find_ndef_tlv, uri_record, normalize_url, encode_tag_url, InvalidURL, Record,
+    LEGACY_HEADER, TLV_NDEF, TLV_LOCK_CONTROL, TLV_TERMINATOR, SR, MB, ME, TNF_WELL_KNOWN,
+)
+
+
+@pytest.mark.parametrize("url", [
+    "https://homebox.local/item/1",
+    "http://www.example.com/",
+    "https://www.example.com/a?b=c",
+    "mailto:someone@example.com",
+    "custom-scheme:thing",
+])
+@pytest.mark.parametrize("legacy_header", [True, False])
+def test_url_round_trip(url, legacy_header):
+    data = encode_url(url, legacy_header=legacy_header)
+    assert data[-1] == TLV_TERMINATOR
+    assert decode_tag_data(data) == url
+
+
+def test_longest_prefix_code_is_used():
+    assert uri_record("https://www.example.com").payload[0] == 0x02
+    assert uri_record("https://example.com").payload[0] == 0x04
+    assert uri_record("nothing-known").payload[0] == 0x00
+
+
+def test_explicit_prefix_code():
+    data = encode_url("https://example.com", prefix_code=0x00)
+    assert decode_tag_data(data) == "https://example.com"
+    assert b"https://example.com" in data
+
+
+def test_legacy_header_layout():
+    data = encode_url("https://a.b/c")
+    assert data[0] == LEGACY_HEADER
+    assert data[1] == TLV_NDEF
+    assert data[2] == len(data) - 4  # Header, tag, length and terminator
+    assert data[3] & (MB | ME | SR) == MB | ME | SR
+
+
+def test_legacy_header_is_not_a_lock_control_tlv():
+    # 01 03 ... followed by an NDEF record header: our own writer's header byte
+    data = encode_url("https://a.b/c")
+    assert find_ndef_tlv(data) == (3, data[2])
+
+
+def test_real_lock_control_tlv_is_skipped():
+    # A Lock Control TLV (01 03 xx xx xx) ahead of the NDEF TLV, as some
+    # factory-formatted tags carry
+    tag_data = bytes([TLV_LOCK_CONTROL, 0x03, 0xA0, 0x10, 0x44]) + encode_url("https://x.y/z", legacy_header=False)
+    assert decode_tag_data(tag_data) == "https://x.y/z"
+
+
+def test_null_tlvs_are_skipped():
+    assert decode_tag_data(bytes([0x00, 0x00]) + encode_url("https://x.y/z", legacy_header=False)) == "https://x.y/z"
+
+
+def test_empty_ndef_and_terminator():
+    assert find_ndef_tlv(bytes([TLV_NDEF, 0x00, TLV_TERMINATOR, 0x00])) == (2, 0)
+    assert find_ndef_tlv(bytes([TLV_TERMINATOR, 0x00, 0x00, 0x00])) is None
+
+
+def test_truncated_tlv_header_raises():
+    with pytest.raises(Exception):
+        find_ndef_tlv(bytes([0x00, 0x00, 0x00, TLV_NDEF]))
+
+
+def test_long_record_and_three_byte_tlv_length():
+    url = "https://homebox.local/" + "x" * 400
+    data = encode_url(url, legacy_header=False)
+    assert data[1] == 0xFF  # 3-byte TLV length
+    assert not data[4] & SR  # Payload over 255 bytes needs a long record
+    assert decode_tag_data(data) == url
+
+
+def test_short_record_boundary():
+    # 255-byte payload still fits a short record, 256 does not
+    for payload_length, short in ((255, True), (256, False)):
+        url = "https://" + "a" * (payload_length - 1)
+        message = encode_message([uri_record(url)])
+        assert bool(message[0] & SR) == short
+        assert decode_url(message) == url
+
+
+def test_multi_record_message():
+    records = [
+        Record(TNF_WELL_KNOWN, b"T", b"", b"\x02enhello"),
+        uri_record("https://second.example/"),
+        Record(TNF_WELL_KNOWN, b"U", b"id", uri_record("https://third.example/").payload),
+    ]
+    decoded = decode_message(encode_message(records))
+    assert [bytes(r.type) for r in decoded] == [b"T", b"U", b"U"]
+    assert bytes(decoded[2].id) == b"id"
+    assert decoded[0].tnf == TNF_WELL_KNOWN
+    # decode_url skips the text record and returns the first URI
+    assert decode_url(encode_message(records)) == "https://second.example/"
+    data = encode_tag_data(records)
+    assert decode_tag_data(data) == "https://second.example/"
+
+
+def test_decode_returns_views_without_copying():
+    message = encode_message([uri_record("https://example.com/")])
+    record = decode_message(message)[0]
+    assert isinstance(record.payload, memoryview)
+    assert record.payload.obj is message
+
+
+def test_record_past_end_raises():
+    message = encode_message([uri_record("https://example.com/")])
+    with pytest.raises(Exception):
+        decode_message(message[:-3])
+
+
+def test_normalize_url():
+    assert normalize_url("https://Example.COM/Item") == "https://example.com/item"
+    for url in ("https://", "HTTP://", "ftp://example.com", "example.com"):
+        with pytest.raises(InvalidURL):
+            normalize_url(url)
+    assert encode_tag_url("https://A.b/C") == encode_url("https://a.b/c")
@@ -0,0 +1,46 @@
+"""Codec throughput over thousands of URLs; run with pytest-benchmark.
+
+    python -m pytest tests/test_ndef_benchmark.py --benchmark-only
+
+Skipped when pytest-benchmark isn't installed. bench_ndef.py measures the
+same thing without it.
+"""
+import pytest
+
+from bench_ndef import make_urls
+from ndef import encode_url, decode_tag_data
+
+pytest.importorskip("pytest_benchmark")
+
+COUNT = 5000
+
+
+@pytest.fixture(scope="module")
+def urls():
+    return make_urls(COUNT)
+
+
+@pytest.fixture(scope="module")
+def encoded(urls):
+    return [encode_url(url) for url in urls]
+
+
+def encode_all(urls):
+    for url in urls:
+        encode_url(url)
+
+
+def decode_all(encoded):
+    for data in encoded:
+        decode_tag_data(data)
+
+
+def test_encode_throughput(benchmark, urls):
+    benchmark.extra_info["urls"] = len(urls)
+    benchmark(encode_all, urls)
+
+
+def test_decode_throughput(benchmark, urls, encoded):
+    benchmark.extra_info["urls"] = len(encoded)
+    benchmark(decode_all, encoded)
+    assert [decode_tag_data(data) for data in encoded[:100]] == urls[:100]
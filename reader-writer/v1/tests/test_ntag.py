@@ -0,0 +1,112 @@
+import pytest
+
+from ndef import encode_tag_url, decode_tag_data
+from ntag import (
+    TagIO, TagError, ProfileCache, NTAG213, NTAG215, NTAG216, identify_tag, read_ndef_message,
+    write_ndef, lock_tag, is_locked, user_capacity,
+)
+from simulator import SimulatedBackend, SimulatedTag
+
+READER = "Simulated ACR1252"
+
+
+def tag_on_reader(profile=NTAG213, direct_transmit=True, sim=None):
+    backend = SimulatedBackend([READER], direct_transmit=direct_transmit)
+    sim = backend.insert(sim or SimulatedTag(profile), READER)
+    return backend, sim, TagIO(backend.connect(READER))
+
+
+def test_fast_read_falls_back_when_unsupported():
+    backend, sim, tag = tag_on_reader(direct_transmit=False)
+    write_ndef(tag, NTAG213, encode_tag_url("https://a.b/c"))
+    assert tag.fast_read_supported is False
+    assert decode_tag_data(sim.user_data()) == "https://a.b/c"
+
+
+def test_fast_read_stays_on_after_a_transient_error():
+    backend, sim, tag = tag_on_reader()
+    with pytest.raises(Exception):
+        tag.read_pages(3, NTAG213.total_pages + 4)  # NAK from the tag, not "not supported"
+    assert tag.fast_read_supported is True
+
+
+@pytest.mark.parametrize("profile", [NTAG213, NTAG215, NTAG216])
+def test_identify_from_get_version(profile):
+    backend, sim, tag = tag_on_reader(profile)
+    assert identify_tag(tag) is profile
+
+
+def test_identify_from_cc_without_direct_transmit():
+    backend, sim, tag = tag_on_reader(NTAG215, direct_transmit=False)
+    assert identify_tag(tag) is NTAG215
+
+
+def test_unknown_tag_is_refused():
+    ultralight = NTAG213._replace(name="Ultralight EV1", storage_size=0x0B, cc_size=0x06)
+    backend, sim, tag = tag_on_reader(ultralight)
+    with pytest.raises(TagError):
+        identify_tag(tag)
+
+
+def test_url_too_long_is_a_tag_error():
+    backend, sim, tag = tag_on_reader()
+    data = encode_tag_url("https://a.b/" + "x" * user_capacity(NTAG213))
+    with pytest.raises(TagError):
+        write_ndef(tag, NTAG213, data)
+    assert sim.writes == 0
+
+
+def test_rewriting_the_same_url_writes_nothing():
+    backend, sim, tag = tag_on_reader()
+    data = encode_tag_url("https://a.b/c")
+    write_ndef(tag, NTAG213, data)
+    writes = sim.writes
+    result = write_ndef(tag, NTAG213, data)
+    assert result.plan.writes == [] and sim.writes == writes
+
+
+@pytest.mark.parametrize("profile", [NTAG213, NTAG216])
+def test_write_verify_lock_and_read_back(profile):
+    backend, sim, tag = tag_on_reader(profile)
+    url = "https://homebox.local/item/" + "x" * (60 if profile is NTAG213 else 400)
+    profile = ProfileCache().lookup(tag)
+    result = write_ndef(tag, profile, encode_tag_url(url))
+    assert result.retried == []
+    assert decode_tag_data(sim.user_data()) == url
+
+    lock_tag(tag, profile)
+    assert is_locked(tag, profile)
+    cc, message = read_ndef_message(tag, profile.user_end)
+    assert cc[0] == 0xE1 and message
+
+    with pytest.raises(TagError):
+        write_ndef(tag, profile, encode_tag_url("https://other/1"))
+
+
+class TornWriteTag(SimulatedTag):
+    """Drops the first write to each page in torn, as a tag pulled away mid-write would."""
+
+    def __init__(self, torn, always=False):
+        super().__init__()
+        self.torn = set(torn)
+        self.always = always
+
+    def write(self, page, data):
+        if page in self.torn:
+            if not self.always:
+                self.torn.discard(page)
+            return
+        super().write(page, data)
+
+
+def test_verify_rewrites_only_the_failing_pages():
+    backend, sim, tag = tag_on_reader(sim=TornWriteTag({5}))
+    result = write_ndef(tag, NTAG213, encode_tag_url("https://homebox.local/item/1"))
+    assert result.retried == [5]
+    assert decode_tag_data(sim.user_data()) == "https://homebox.local/item/1"
+
+
+def test_verify_gives_up_after_the_retry():
+    backend, sim, tag = tag_on_reader(sim=TornWriteTag({5}, always=True))
+    with pytest.raises(Exception, match="Verify failed at page"):
+        write_ndef(tag, NTAG213, encode_tag_url("https://homebox.local/item/1"))
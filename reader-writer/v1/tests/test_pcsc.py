@@ -0,0 +1,47 @@
+import queue
+
+from pcsc import CardMonitor
+from simulator import SimulatedBackend, reader_name
+
+READERS = [reader_name(0), reader_name(1)]
+
+
+def initial_states(events, count):
+    # The first wait reports every watched reader's current state
+    return sorted(events.get(timeout=2) for _ in range(count))
+
+
+def test_card_monitor_reports_inserts_and_removals():
+    backend = SimulatedBackend(READERS)
+    events = queue.Queue()
+    monitor = CardMonitor(backend, lambda name, present: events.put((name, present)))
+    monitor.watch(READERS)
+    monitor.start()
+    try:
+        assert initial_states(events, 2) == [(READERS[0], False), (READERS[1], False)]
+        backend.insert(reader_name=READERS[1])
+        assert events.get(timeout=2) == (READERS[1], True)
+        assert monitor.is_present(READERS[1]) and not monitor.is_present(READERS[0])
+        backend.remove(READERS[1])
+        assert events.get(timeout=2) == (READERS[1], False)
+    finally:
+        monitor.stop()
+
+
+def test_card_monitor_ignores_readers_it_no_longer_watches():
+    backend = SimulatedBackend(READERS)
+    events = queue.Queue()
+    monitor = CardMonitor(backend, lambda name, present: events.put((name, present)))
+    monitor.watch(READERS[:1])
+    monitor.start()
+    try:
+        assert initial_states(events, 1) == [(READERS[0], False)]
+        backend.insert(reader_name=READERS[1])
+        backend.insert(reader_name=READERS[0])
+        assert events.get(timeout=2) == (READERS[0], True)
+        # Re-pointing the monitor wakes it without waiting for an event
+        monitor.watch(READERS[1:])
+        assert events.get(timeout=2) == (READERS[1], True)
+        assert events.empty()
+    finally:
+        monitor.stop()
@@ -0,0 +1,58 @@
+from functools import partial
+import time
+
+import pytest
+
+from jobs import JobQueue
+from journal import Journal
+from procstation import ProcessStation, simulated_backend
+from simulator import reader_name
+from tagcache import LockedTagCache
+
+
+def run_station(readers, jobs, journal, locked_tags, latency=0.0, seconds=None):
+    names = [reader_name(i) for i in range(readers)]
+    station = ProcessStation(partial(simulated_backend, latency=latency), jobs, names, journal=journal,
+                             batch="batch", locked_tags=locked_tags, swap_tags=True)
+    station.start()
+    deadline = time.monotonic() + (seconds or 30)
+    while not jobs.done() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    station.stop()
+    return station
+
+
+def locked_per_job(journal):
+    journal.flush()
+    return dict(journal._query("SELECT job, COUNT(*) FROM events WHERE batch = 'batch' AND state = 'locked' GROUP BY job"))
+
+
+@pytest.mark.parametrize("readers", [2, 3])
+def test_every_job_written_exactly_once(readers):
+    journal = Journal(":memory:")
+    locked_tags = LockedTagCache(":memory:")
+    jobs = JobQueue([f"https://homebox.local/item/{i}" for i in range(30)], 30)
+    station = run_station(readers, jobs, journal, locked_tags)
+
+    assert jobs.progress() == {"written": 30, "failed": 0, "skipped": 0, "total": 30}
+    assert locked_per_job(journal) == {i: 1 for i in range(30)}
+    assert sum(c["written"] for c in station.counters().values()) == 30
+    # Every process makes its own tags, so UIDs must not repeat across them
+    assert len(locked_tags.entries) == 30
+    journal.close()
+    locked_tags.close()
+
+
+def test_stop_keeps_tags_finished_while_stopping():
+    journal = Journal(":memory:")
+    jobs = JobQueue([f"https://homebox.local/item/{i}" for i in range(1000)], 1000)
+    station = run_station(2, jobs, journal, None, latency=0.005, seconds=1.5)
+
+    assert not station.in_flight
+    written = jobs.progress()["written"]
+    assert 0 < written < 1000
+    # Tags the processes finished are counted once; nothing else was given back as failed
+    assert sum(c["written"] for c in station.counters().values()) == written
+    assert len(locked_per_job(journal)) == written
+    assert jobs.failed == len(jobs.retry)
+    journal.close()
@@ -0,0 +1,30 @@
+import queue
+
+from registry import ReaderRegistry
+from simulator import SimulatedBackend, reader_name
+
+
+def test_hot_plugged_readers_are_reported():
+    backend = SimulatedBackend([reader_name(0)])
+    changes = queue.Queue()
+    registry = ReaderRegistry(backend, changes.put)
+    registry.start()
+    try:
+        assert changes.get(timeout=2) == [reader_name(0)]
+        backend.add_reader(reader_name(1))
+        assert changes.get(timeout=2) == [reader_name(0), reader_name(1)]
+        assert registry.names() == [reader_name(0), reader_name(1)]
+        backend.remove_reader(reader_name(0))
+        assert changes.get(timeout=2) == [reader_name(1)]
+    finally:
+        registry.stop()
+    assert registry.thread is None
+
+
+def test_refresh_only_calls_back_on_a_change():
+    backend = SimulatedBackend([reader_name(0)])
+    changes = []
+    registry = ReaderRegistry(backend, changes.append)
+    assert registry.refresh() == [reader_name(0)]
+    registry.refresh()
+    assert changes == [[reader_name(0)]]
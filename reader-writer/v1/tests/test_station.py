@@ -0,0 +1,51 @@
+import queue
+import threading
+
+import pytest
+
+from jobs import JobQueue
+from ndef import decode_tag_data
+from simulator import SimulatedBackend, reader_name
+from station import WriteStation, WRITING, DONE, FINISHED
+from tagcache import LockedTagCache
+
+
+def operate(backend, station, name, statuses, written):
+    # A simulated operator: place a tag, wait for the verdict, take it off
+    while True:
+        tag = backend.insert(reader_name=name)
+        station.on_card_event(name, True)
+        status = statuses[name].get(timeout=5)
+        while status == WRITING:
+            status = statuses[name].get(timeout=5)
+        backend.remove(name)
+        station.on_card_event(name, False)
+        statuses[name].get(timeout=5)  # Back to idle
+        if status == FINISHED:
+            return
+        if status == DONE:
+            written.append(tag)
+
+
+@pytest.mark.parametrize("readers", [2, 3, 4])
+def test_every_job_written_exactly_once(readers, tmp_path):
+    names = [reader_name(i) for i in range(readers)]
+    backend = SimulatedBackend(names)
+    urls = [f"https://homebox.local/item/{i}" for i in range(40)]
+    jobs = JobQueue(urls, len(urls))
+    locked_tags = LockedTagCache(str(tmp_path / "tags.sqlite3"))
+    statuses = {name: queue.Queue() for name in names}
+    station = WriteStation(backend, jobs, names, locked_tags=locked_tags,
+                           on_status=lambda name, status, detail: statuses[name].put(status))
+    written = []
+    operators = [threading.Thread(target=operate, args=(backend, station, name, statuses, written)) for name in names]
+    for operator in operators:
+        operator.start()
+    for operator in operators:
+        operator.join(30)
+    station.stop()
+
+    assert sorted(decode_tag_data(tag.user_data()) for tag in written) == sorted(urls)
+    assert jobs.progress() == {"written": len(urls), "failed": 0, "skipped": 0, "total": len(urls)}
+    assert all(locked_tags.get(tag.uid) for tag in written)
+    locked_tags.close()
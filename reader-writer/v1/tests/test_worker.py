@@ -0,0 +1,35 @@
+import threading
+
+import pytest
+
+from worker import DeviceWorker
+
+
+def test_urgent_commands_run_ahead_of_queued_ones():
+    worker = DeviceWorker()
+    gate = threading.Event()
+    ran = []
+    worker.submit(gate.wait)  # Hold the worker so the rest queue up
+    futures = [worker.submit(ran.append, f"normal {i}") for i in range(3)]
+    futures.append(worker.submit_urgent(ran.append, "urgent"))
+    gate.set()
+    for future in futures:
+        future.result(timeout=2)
+    worker.stop()
+    assert ran == ["urgent", "normal 0", "normal 1", "normal 2"]
+
+
+def test_errors_come_back_through_the_future():
+    worker = DeviceWorker()
+    with pytest.raises(ZeroDivisionError):
+        worker.submit(lambda: 1 / 0).result(timeout=2)
+    assert worker.submit(lambda: "still running").result(timeout=2) == "still running"
+    worker.stop()
+
+
+def test_stop_runs_what_is_already_queued():
+    worker = DeviceWorker()
+    future = worker.submit(lambda: "queued")
+    worker.stop()
+    assert future.result(timeout=0) == "queued"
+    assert not worker.thread.is_alive()
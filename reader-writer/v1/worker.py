@@ -0,0 +1,51 @@
+"""Device worker: a single thread that owns the smartcard connections.
+
+Every transmit() goes through here so a slow or hung reader only ever blocks
+this thread, never the GUI. Operations are queued and return a
+concurrent.futures.Future; the GUI turns completions into Qt signals.
+Urgent operations (tag writes) run ahead of anything else still queued.
+"""
+from concurrent.futures import Future
+import itertools
+import queue
+import threading
+
+
+class DeviceWorker:
+    URGENT, NORMAL, LAST = range(3)
+
+    def __init__(self, name="device-worker"):
+        self.commands = queue.PriorityQueue()
+        self.order = itertools.count()  # FIFO within a priority
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        return self._put(self.NORMAL, fn, args, kwargs)
+
+    def submit_urgent(self, fn, *args, **kwargs):
+        return self._put(self.URGENT, fn, args, kwargs)
+
+    def _put(self, priority, fn, args, kwargs):
+        future = Future()
+        self.commands.put((priority, next(self.order), (future, fn, args, kwargs)))
+        return future
+
+    def stop(self, wait=True, timeout=2):
+        # Runs after everything already queued; wait=False returns at once
+        self.commands.put((self.LAST, next(self.order), None))
+        if wait:
+            self.thread.join(timeout=timeout)
+
+    def _run(self):
+        while True:
+            priority, order, command = self.commands.get()
+            if command is None:
+                break
+            future, fn, args, kwargs = command
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
@@ -6,9 +6,14 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import QTimer
 from smartcard.System import readers
 from smartcard.Exceptions import NoCardException
+import os
 import sys
 import webbrowser
 
+# The NDEF codec lives with the reader/writer app and is shared with it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'reader-writer', 'v1'))
+from ndef import encode_url, decode_tag_data
+
 class NFCApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -265,6 +270,7 @@ class NFCApp(QMainWindow):
             return False
 
     def _write_data(self, page, data):
+        data = list(data)
         while len(data) < 4:
             data.append(0x00)
         apdu = [0xFF, 0xD6, 0x00, page] + [len(data)] + data
@@ -317,104 +323,22 @@ class NFCApp(QMainWindow):
                     
                 current_page += 1
             
-            # Trim data at terminator
-            if 0xFE in ndef_data:
-                terminator_index = ndef_data.index(0xFE)
-                ndef_data = ndef_data[:terminator_index + 1]
-            
-            self.read_log(f"Trimmed NDEF data: {' '.join([hex(x) for x in ndef_data])}")
-
-            # Find NDEF record in the data (should start with 0xD1)
-            ndef_start = 3  # NDEF record starts after TLV tag and length
-            if ndef_data[ndef_start] != 0xD1:  # NDEF header (MB=1, ME=1, SR=1, TNF=1)
-                self.read_log(f"Invalid NDEF header: {hex(ndef_data[ndef_start])}")
-                return
-
-            self.read_log(f"Found NDEF record at offset: {ndef_start}")
-
-            # Parse record header
-            type_length = ndef_data[ndef_start + 1]
-            payload_length = ndef_data[ndef_start + 2]
-            record_offset = ndef_start + 3
-
-            self.read_log(f"Type length: {type_length}, Payload length: {payload_length}")
-
-            # Verify URI record type
-            if ndef_data[record_offset] != 0x55:  # 'U' type
-                self.read_log(f"Not a URI record: {hex(ndef_data[record_offset])}")
+            url = decode_tag_data(bytes(ndef_data))
+            if url is None:
+                self.read_log("No URL found on tag")
                 return
 
-            # Get URL prefix and data
-            prefix_code = ndef_data[record_offset + 1]
-            url_start = record_offset + 2
-
-            self.read_log(f"URL prefix code: {hex(prefix_code)}")
-
-            # Handle different URL prefixes
-            prefix_map = {
-                0x00: "",           # No prefix
-                0x01: "http://www.",
-                0x02: "https://www.",
-                0x03: "http://",
-                0x04: "https://"
-            }
-            
-            if prefix_code in prefix_map:
-                # URL length is payload_length - 1 (subtract prefix byte)
-                url_bytes = ndef_data[url_start:url_start + payload_length - 1]
-                url = prefix_map[prefix_code] + bytes(url_bytes).decode('utf-8')
-                
-                self.read_log(f"Extracted URL bytes: {' '.join([hex(x) for x in url_bytes])}")
-                
-                if self.url_display.text() != url:
-                    self.url_display.setText(url)
-                    self.read_log(f"URL detected: {url}")
-                    webbrowser.get('google-chrome').open(url)
-            else:
-                self.read_log(f"Unsupported URL prefix code: {hex(prefix_code)}")
+            if self.url_display.text() != url:
+                self.url_display.setText(url)
+                self.read_log(f"URL detected: {url}")
+                webbrowser.get('google-chrome').open(url)
 
         except Exception as e:
             self.read_log(f"Error reading tag: {str(e)}")
 
     def create_ndef_url(self, url):
-        url = url.lower().replace('https://', '').replace('http://', '')
-        url_bytes = url.encode()
-        url_length = len(url_bytes)
-        
-        # Calculate total NDEF message length (including all headers)
-        ndef_length = url_length + 5  # URL + NDEF header(1) + type length(1) + payload length(1) + type(1) + prefix(1)
-        
-        # Use extended length format for larger payloads
-        if ndef_length > 254:
-            message = [
-                0x01,  # Proprietary header
-                0x03,  # NDEF message TLV tag
-                0xFF,  # Extended length marker
-                (ndef_length >> 8) & 0xFF,  # Length high byte
-                ndef_length & 0xFF,         # Length low byte
-                0xD1,  # NDEF header (MB=1, ME=1, SR=1, TNF=1)
-                0x01,  # Type length (1 byte for 'U')
-                url_length + 1,  # Payload length (URL + prefix byte)
-                0x55,  # 'U' type
-                0x04,  # https:// prefix
-            ]
-        else:
-            message = [
-                0x01,  # Proprietary header
-                0x03,  # NDEF message TLV tag
-                ndef_length,  # Length
-                0xD1,  # NDEF header (MB=1, ME=1, SR=1, TNF=1)
-                0x01,  # Type length (1 byte for 'U')
-                url_length + 1,  # Payload length (URL + prefix byte)
-                0x55,  # 'U' type
-                0x04,  # https:// prefix
-            ]
-        
-        # Add URL and terminator
-        message.extend(url_bytes)
-        message.append(0xFE)  # TLV terminator
-        
-        return message
+        # The codec picks the longest matching URI prefix code
+        return encode_url(url.lower())
 
     def lock_tag(self):
         try: